@@ -82,7 +82,7 @@ impl BackerUpper {
                 count += 1;
                 earliest = earliest.min(scrape.date);
                 latest = latest.max(scrape.date);
-                w.write_all(serde_json::to_string(&scrape)?.as_bytes())?;
+                serde_json::to_writer(&mut w, &scrape)?;
                 w.write(&NEWLINE)?;
                 Ok(())
             },
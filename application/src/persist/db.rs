@@ -129,13 +129,16 @@ impl DB {
                 values
             );
 
+            // Commit the whole batch at once rather than paying for an implicit transaction per row
             let conn = self.connection.read();
-            let mut prep = conn.prepare(&sql)?;
+            let tx = conn.unchecked_transaction()?;
+            let mut prep = tx.prepare(&sql)?;
             for t in t {
                 let params = serde_rusqlite::to_params_named(t)?;
                 prep.execute(params.to_slice().as_slice())?;
             }
             prep.finalize()?;
+            tx.commit()?;
         }
         Ok(())
     }
@@ -202,6 +205,39 @@ impl DB {
         }
     }
 
+    pub fn load_batch<T: Serialize + DeserializeOwned>(
+        &self,
+        ids: &[String],
+    ) -> Result<Vec<T>, PersistError> {
+        self.load_batch_schema(None, ids)
+    }
+
+    /// Loads all of the rows matching the given ids, in no particular order. Missing ids are skipped.
+    pub fn load_batch_schema<T: Serialize + DeserializeOwned>(
+        &self,
+        schema: Option<&str>,
+        ids: &[String],
+    ) -> Result<Vec<T>, PersistError> {
+        // Stay well under SQLite's limit on the number of bound parameters
+        const MAX_IDS_PER_QUERY: usize = 500;
+        let mut v = vec![];
+        let db = self.connection.read();
+        for chunk in ids.chunks(MAX_IDS_PER_QUERY) {
+            let sql = format!(
+                "select * from {}.{} where id in ({})",
+                Self::schema_for(schema),
+                Self::table_for::<T>(),
+                vec!["?"; chunk.len()].join(",")
+            );
+            let mut stmt = db.prepare(&sql)?;
+            let mut res = stmt.query(rusqlite::params_from_iter(chunk))?;
+            while let Some(row) = res.next()? {
+                v.push(serde_rusqlite::from_row::<T>(row)?);
+            }
+        }
+        Ok(v)
+    }
+
     pub fn execute_raw(&self, sql: &str) -> Result<(), PersistError> {
         self.connection.read().execute_batch(sql)?;
         Ok(())
@@ -252,7 +288,7 @@ mod test {
     use super::*;
     use serde::{Deserialize, Serialize};
 
-    #[derive(Deserialize, Serialize, Debug, Default, Eq, PartialEq)]
+    #[derive(Deserialize, Serialize, Clone, Debug, Default, Eq, PartialEq)]
     struct TestSerialize {
         id: String,
         integer: u32,
@@ -289,6 +325,23 @@ mod test {
         assert_eq!(Some(input), output);
     }
 
+    #[test]
+    fn load_store_batch() {
+        let db = DB::open(":memory:").unwrap();
+        db.create_table::<TestSerialize>().unwrap();
+        let input = ["a", "b", "c"].map(|id| TestSerialize {
+            id: id.into(),
+            integer: 1,
+            string: "hello".into(),
+        });
+        db.store_batch(input.iter().collect()).unwrap();
+        let mut output = db
+            .load_batch::<TestSerialize>(&["c".into(), "a".into(), "missing".into()])
+            .unwrap();
+        output.sort_by(|a, b| a.id.cmp(&b.id));
+        assert_eq!(output, vec![input[0].clone(), input[2].clone()]);
+    }
+
     #[test]
     fn load_store_missing() {
         let db = DB::open(":memory:").unwrap();
@@ -8,7 +8,7 @@ use tantivy::query::{
 use tantivy::tokenizer::{SimpleTokenizer, Tokenizer, TokenizerManager};
 use tantivy::{schema::*, DocAddress, IndexWriter, Searcher, SegmentReader};
 
-use progscrape_scrapers::{ScrapeCollection, StoryDate, StoryUrl, TypedScrape};
+use progscrape_scrapers::{ScrapeCollection, ScrapeId, StoryDate, StoryUrl, TypedScrape};
 
 use std::borrow::Cow;
 use std::collections::{HashMap, HashSet};
@@ -27,7 +27,7 @@ use crate::{
     StorageWriter, Story, StoryEvaluator, StoryIdentifier,
 };
 
-use super::indexshard::{tokenize_domain, StoryInsert};
+use super::indexshard::{domain_terms, StoryInsert};
 use super::schema::StorySchema;
 
 const STORY_INDEXING_CHUNK_SIZE: usize = 10000;
@@ -63,6 +63,9 @@ pub struct StoryIndex {
     index_cache: SharedMut<IndexCache>,
     scrape_db: ScrapeStore,
     schema: StorySchema,
+    /// Built once and shared by every query parser, as constructing the default stemming tokenizers
+    /// is not free.
+    tokenizers: TokenizerManager,
 }
 
 struct WriterProvider {
@@ -124,6 +127,7 @@ impl StoryIndex {
             }),
             scrape_db,
             schema,
+            tokenizers: TokenizerManager::default(),
         };
 
         Ok(new)
@@ -228,21 +232,26 @@ impl StoryIndex {
         let title = extracted.title().to_owned();
         let mut tags = TagSet::new();
         eval.tagger.tag(&title, &mut tags);
-        for tag in extracted.tags() {
-            if let Some(tag) = eval.tagger.check_tag_search(&tag) {
-                tags.add(tag);
-            } else {
-                tags.add(tag);
-            }
-        }
+        // Scrapes from different sources frequently carry the same tag in different cases, so
+        // collapse those before looking each one up
+        let raw_tags: HashSet<_> = extracted
+            .tags()
+            .map(|tag| tag.to_ascii_lowercase())
+            .collect();
+        tags.extend(
+            raw_tags
+                .iter()
+                .map(|tag| eval.tagger.check_tag_search(tag).unwrap_or(tag.as_str())),
+        );
         let url = extracted.url();
-        let id = StoryIdentifier::new(story.earliest, extracted.url().normalization()).to_base64();
+        let norm = url.normalization();
+        let id = StoryIdentifier::new(story.earliest, norm).to_base64();
         let doc = StoryInsert {
             id,
             host: url.host().to_owned(),
             url: url.raw().to_owned(),
-            url_norm: url.normalization().string().to_owned(),
-            url_norm_hash: url.normalization().hash(),
+            url_norm: norm.string().to_owned(),
+            url_norm_hash: norm.hash(),
             score: score as f64,
             date: story.earliest.timestamp(),
             title,
@@ -261,69 +270,118 @@ impl StoryIndex {
         scrapes: I,
     ) -> Result<Vec<(ScrapeCollection, Shard, Option<DocAddress>)>, PersistError> {
         let one_month = Duration::from_secs(60 * 60 * 24 * 30).as_secs() as i64;
-        let mut res = vec![];
-
-        // TODO: We could easily be batching the lookups here, though managing that batching
-        // could be somewhat complicated.
-        for story in scrapes {
-            let current_shard = Shard::from_date_time(story.earliest);
-            let mut shard = current_shard;
-            let mut i = 0;
-            let (shard, doc_address) = loop {
-                // Look this document up in the current shard.
-                let doc_address = self.with_index(shard, |_, index| {
-                    let lookup = StoryLookupId {
-                        url_norm_hash: story.url().normalization().hash(),
-                        date: story.earliest.timestamp(),
-                    };
-                    let lookup = HashSet::from_iter([lookup]);
-                    let result = index.lookup_stories(lookup, (-one_month)..one_month)?;
-                    Ok(match result.into_iter().next() {
-                        Some(StoryLookup::Found(_, doc)) => Some(doc),
-                        _ => None,
-                    })
-                })?;
-
-                // We break out of the loop if we find a document, _or_ if we're not searching shard w/offset zero
-                break if doc_address.is_some() {
-                    (shard, doc_address)
-                } else if i == 0 {
-                    // Not found, and we're looking at the current shard. Let's go back one month and look there instead.
-                    i -= 1;
-                    shard = shard.sub_months(1);
-                    continue;
-                } else {
-                    // Not found one shard back either, so insert in current shard.
-                    (current_shard, None)
+        let stories = scrapes
+            .into_iter()
+            .map(|story| {
+                let lookup = StoryLookupId {
+                    url_norm_hash: story.url().normalization().hash(),
+                    date: story.earliest.timestamp(),
                 };
-            };
-            res.push((story, shard, doc_address));
+                (story, lookup)
+            })
+            .collect_vec();
+
+        // Look every story up in its own shard first, batched per shard. Anything not found there gets a second,
+        // batched lookup one month back.
+        let mut found: HashMap<StoryLookupId, (Shard, DocAddress)> = HashMap::new();
+        for months_back in [0, 1] {
+            let mut per_shard: HashMap<Shard, HashSet<StoryLookupId>> = HashMap::new();
+            for (story, lookup) in &stories {
+                if !found.contains_key(lookup) {
+                    let shard = Shard::from_date_time(story.earliest).sub_months(months_back);
+                    per_shard.entry(shard).or_default().insert(*lookup);
+                }
+            }
+            for (shard, lookups) in per_shard {
+                let index = self.get_shard(shard)?;
+                let result = index
+                    .read()
+                    .lookup_stories(lookups, (-one_month)..one_month)?;
+                for lookup in result {
+                    if let StoryLookup::Found(lookup, doc) = lookup {
+                        found.insert(lookup, (shard, doc));
+                    }
+                }
+            }
         }
-        Ok(res)
+
+        Ok(stories
+            .into_iter()
+            .map(|(story, lookup)| match found.get(&lookup) {
+                Some((shard, doc)) => (story, *shard, Some(*doc)),
+                // Not found in either shard, so insert in the current one.
+                None => {
+                    let shard = Shard::from_date_time(story.earliest);
+                    (story, shard, None)
+                }
+            })
+            .collect_vec())
     }
 
+    /// Index a batch of scrapes. Scrapes in `unchanged` were already in the scrape store with identical contents, so a
+    /// story made up only of those can be skipped, but only if its existing document already holds every one of them.
     fn insert_scrape_batch<'a, I: IntoIterator<Item = TypedScrape> + 'a>(
         &mut self,
         eval: &StoryEvaluator,
         scrapes: I,
+        unchanged: &HashSet<ScrapeId>,
     ) -> Result<Vec<ScrapePersistResult>, PersistError> {
         let mut memindex = MemIndex::default();
         memindex.insert_scrapes(scrapes)?;
         let positions = self.find_insert_position(memindex.get_all_stories())?;
 
+        // Look up every story we're merging into, so all of the existing scrapes can be loaded from the scrape store
+        // in a single batch rather than one query per story.
+        let mut existing = vec![];
+        for (story, shard, doc_address) in &positions {
+            existing.push(if let Some(doc) = doc_address {
+                let existing = self.with_index(*shard, |_, index| index.lookup_story(*doc))?;
+                let indexed = story.scrapes.keys().all(|id| {
+                    unchanged.contains(id)
+                        && existing
+                            .scrape_ids
+                            .iter()
+                            .any(|existing| &existing.id == id)
+                });
+                Some((existing, indexed))
+            } else {
+                None
+            });
+        }
+        let existing_scrapes = self.scrape_db.fetch_scrape_batch(
+            existing
+                .iter()
+                .flatten()
+                .filter(|(_, indexed)| !indexed)
+                .flat_map(|(story, _)| story.scrape_ids.iter().cloned()),
+        )?;
+
         self.with_writers(|provider| {
             let mut res = vec![];
-            for (story, shard, doc_address) in positions {
+            for ((story, shard, _), existing) in positions.into_iter().zip(existing) {
+                let existing = match existing {
+                    Some((_, true)) => {
+                        res.push(ScrapePersistResult::AlreadyPartOfExistingStory);
+                        continue;
+                    }
+                    Some((existing, false)) => Some(existing),
+                    None => None,
+                };
                 res.push(provider.provide(shard, |_, index, writer| {
-                    if let Some(doc) = doc_address {
-                        let doc = index.with_searcher(|searcher, _| Ok(searcher.doc(doc)?))?;
-                        let ids = index.extract_scrape_ids_from_doc(&doc);
-                        let scrapes = self.scrape_db.fetch_scrape_batch(ids)?;
-                        let mut orig_story =
-                            ScrapeCollection::new_from_iter(scrapes.into_values().flatten());
+                    if let Some(existing) = existing {
+                        let scrapes = existing
+                            .scrape_ids
+                            .iter()
+                            .filter_map(|id| existing_scrapes.get(&id.id).cloned().flatten());
+                        let mut orig_story = ScrapeCollection::new_from_iter(scrapes);
                         orig_story.merge_all(story);
                         let doc = Self::create_story_insert(eval, &orig_story);
-                        index.reinsert_story_document(writer, doc)
+                        // Re-scraping a story often changes nothing, in which case we leave the document alone
+                        if doc.matches(&existing) {
+                            Ok(ScrapePersistResult::AlreadyPartOfExistingStory)
+                        } else {
+                            index.reinsert_story_document(writer, doc)
+                        }
                     } else {
                         let doc = Self::create_story_insert(eval, &story);
                         index.insert_story_document(writer, doc)
@@ -343,10 +401,10 @@ impl StoryIndex {
         let v = scrapes.into_iter().collect_vec();
 
         tracing::info!("Storing raw scrapes...");
-        self.scrape_db.insert_scrape_batch(v.iter())?;
+        let unchanged = self.scrape_db.insert_changed_scrape_batch(v.iter())?;
 
         tracing::info!("Indexing scrapes...");
-        self.insert_scrape_batch(eval, v)
+        self.insert_scrape_batch(eval, v, &unchanged)
     }
 
     fn insert_scrape_collections<I: IntoIterator<Item = ScrapeCollection>>(
@@ -407,17 +465,20 @@ impl StoryIndex {
                 let searcher = self.fetch_by_id(&id);
                 let docs = self.with_searcher(id.shard(), searcher)?;
                 if let Some((shard, doc)) = docs.first() {
-                    provider.provide(*shard, |_, index, writer| {
-                        let doc = index.with_searcher(|searcher, _| Ok(searcher.doc(*doc)?))?;
-                        let ids = index.extract_scrape_ids_from_doc(&doc);
+                    res.push(provider.provide(*shard, |_, index, writer| {
+                        let existing = index.lookup_story(*doc)?;
+                        let ids = existing.scrape_ids.clone();
                         let scrapes = self.scrape_db.fetch_scrape_batch(ids)?;
                         let orig_story =
                             ScrapeCollection::new_from_iter(scrapes.into_values().flatten());
                         let doc = Self::create_story_insert(eval, &orig_story);
-                        index.reinsert_story_document(writer, doc)?;
-                        Ok(())
-                    })?;
-                    res.push(ScrapePersistResult::MergedWithExistingStory);
+                        // Unless the evaluator has changed, re-indexing rebuilds the same document
+                        if doc.matches(&existing) {
+                            Ok(ScrapePersistResult::AlreadyPartOfExistingStory)
+                        } else {
+                            index.reinsert_story_document(writer, doc)
+                        }
+                    })?);
                 } else {
                     res.push(ScrapePersistResult::NotFound)
                 }
@@ -527,6 +588,15 @@ impl StoryIndex {
         }
     }
 
+    /// Creates a query parser over the title and tags fields that shares this index's tokenizers.
+    fn title_and_tags_query_parser(&self) -> QueryParser {
+        QueryParser::new(
+            self.schema.schema.clone(),
+            vec![self.schema.title_field, self.schema.tags_field],
+            self.tokenizers.clone(),
+        )
+    }
+
     fn parse_tag_search(
         &self,
         tag: &str,
@@ -544,11 +614,7 @@ impl StoryIndex {
         // );
 
         // Note that a tag is ASCII, so this is kind of overkill but works
-        let mut query_parser = QueryParser::new(
-            self.schema.schema.clone(),
-            vec![self.schema.title_field, self.schema.tags_field],
-            TokenizerManager::default(),
-        );
+        let mut query_parser = self.title_and_tags_query_parser();
         // Boost search within tags
         query_parser.set_field_boost(self.schema.tags_field, 10.0);
         let query = if let Some(alt) = alt {
@@ -562,10 +628,7 @@ impl StoryIndex {
 
     fn parse_domain_search(&self, domain: &str) -> Result<Box<dyn Query>, PersistError> {
         let host_field = self.schema.host_field;
-        let phrase = tokenize_domain(domain)
-            .into_iter()
-            .map(|s| Term::from_field_text(host_field, &s.text))
-            .collect_vec();
+        let phrase = domain_terms(host_field, domain);
 
         // This shouldn't be possible
         if phrase.is_empty() {
@@ -598,11 +661,7 @@ impl StoryIndex {
     }
 
     fn parse_text_search(&self, search: &str) -> Result<Box<dyn Query>, PersistError> {
-        let mut query_parser = QueryParser::new(
-            self.schema.schema.clone(),
-            vec![self.schema.title_field, self.schema.tags_field],
-            TokenizerManager::default(),
-        );
+        let mut query_parser = self.title_and_tags_query_parser();
         // Boost search within tags
         query_parser.set_field_boost(self.schema.tags_field, 3.0);
 
@@ -623,35 +682,50 @@ impl StoryIndex {
         Ok(query)
     }
 
+    /// Reduce a title to the lowercase, alphanumeric words we search for related stories with, with some manual
+    /// stop-word removal.
+    fn related_title_terms(title: &str) -> String {
+        // TODO: we need to index everything with stemming and stop-word removal!
+        let title: String = if title.is_ascii() {
+            // Most titles are ASCII, which we can map byte-by-byte without any char decoding
+            title
+                .bytes()
+                .map(|b| {
+                    if b.is_ascii_alphanumeric() {
+                        b.to_ascii_lowercase() as char
+                    } else {
+                        ' '
+                    }
+                })
+                .collect()
+        } else {
+            title
+                .chars()
+                .map(|c| if c.is_alphanumeric() { c } else { ' ' })
+                .flat_map(char::to_lowercase)
+                .collect()
+        };
+        title
+            .split_whitespace()
+            .filter(|word| !matches!(*word, "the" | "a"))
+            .join(" ")
+    }
+
     fn parse_related_search(
         &self,
         title: &str,
         tags: &[String],
     ) -> Result<Box<dyn Query>, PersistError> {
-        let mut query_parser = QueryParser::new(
-            self.schema.schema.clone(),
-            vec![self.schema.title_field, self.schema.tags_field],
-            TokenizerManager::default(),
-        );
+        let mut query_parser = self.title_and_tags_query_parser();
         query_parser.set_field_boost(self.schema.title_field, 2.0);
 
-        // Parse the alphanumeric bits of a title with some manual stop-word removal
-        // TODO: we need to index everything with stemming and stop-word removal!
-        let title = title.to_lowercase().replace(" the ", " ");
-        let title = title.replace(" a ", " ");
-        let title = title.trim_start_matches("the ");
-        let title = title.trim_start_matches("a ");
-        let title_query = query_parser
-            .parse_query(&title.replace(|c: char| c != ' ' && !c.is_alphanumeric(), " "))?;
+        let title_query = query_parser.parse_query(&Self::related_title_terms(title))?;
 
         let mut subqueries = vec![(Occur::Should, title_query)];
         for tag in tags {
             // TODO: we need to ensure these are display tags!
             let query: Box<dyn Query> = if tag.trim_matches('.').contains('.') {
-                let phrase = tokenize_domain(tag)
-                    .into_iter()
-                    .map(|s| Term::from_field_text(self.schema.host_field, &s.text))
-                    .collect_vec();
+                let phrase = domain_terms(self.schema.host_field, tag);
                 Box::new(BoostQuery::new(Box::new(PhraseQuery::new(phrase)), 10.0))
             } else {
                 Box::new(BoostQuery::new(
@@ -948,7 +1022,11 @@ mod test {
     };
     use tempfile::tempdir;
 
-    use crate::{story::TagSet, test::*, MemIndex};
+    use crate::{
+        story::{StoryTagger, TagSet},
+        test::*,
+        MemIndex,
+    };
     use rstest::*;
 
     fn populate_shard(
@@ -1064,6 +1142,23 @@ mod test {
         test_range!(0, 0..=10, 15);
     }
 
+    /// Titles are reduced to lowercase alphanumeric words, splitting on punctuation and dropping stop words.
+    #[rstest]
+    #[case("I love Rust", "i love rust")]
+    #[case("The Rust Programming Language", "rust programming language")]
+    #[case("A tour of the Rust compiler", "tour of rust compiler")]
+    #[case("Rust's ownership: a primer (2023)", "rust s ownership primer 2023")]
+    #[case("The-A-Team uses C++/CLI", "team uses c cli")]
+    #[case("  Lots   of\tspace  ", "lots of space")]
+    #[case("Theory and analysis", "theory and analysis")]
+    #[case("Über die Größe von Straßen", "über die größe von straßen")]
+    #[case("\u{201c}The\u{201d} end \u{2014} a story", "end story")]
+    #[case("ΑΘΗΝΑ: the city", "αθηνα city")]
+    #[case("", "")]
+    fn test_related_title_terms(#[case] title: &str, #[case] expected: &str) {
+        assert_eq!(StoryIndex::related_title_terms(title), expected);
+    }
+
     #[rstest]
     fn test_index_scrapes(_enable_tracing: &bool) -> Result<(), Box<dyn std::error::Error>> {
         use ScrapeSource::*;
@@ -1180,15 +1275,34 @@ mod test {
             .fetch_one::<Shard>(&StoryQuery::from_search(&eval.tagger, "rust"))?
             .expect("Missing story");
 
-        // Re-insert it and make sure it comes back with the right info
+        // Re-insert it with the same evaluator: nothing changes, so the document is left alone
+        assert_eq!(
+            index.reinsert_stories(&eval, [story.id.clone()])?,
+            vec![ScrapePersistResult::AlreadyPartOfExistingStory]
+        );
+        let story = index
+            .fetch_one::<Shard>(&StoryQuery::from_search(&eval.tagger, "rust"))?
+            .expect("Missing story");
+        assert_eq!(story.title, "I love Rust");
+        assert_eq!(story.tags, TagSet::from_iter(["rust"]));
+
+        // Re-insert it with a tagger that also knows about love, and make sure it comes back with the right info
+        let tagger = serde_json::from_value(serde_json::json!({
+            "tags": { "testing": { "rust": {}, "love": {} } }
+        }))?;
+        let eval = StoryEvaluator {
+            tagger: StoryTagger::new(&tagger),
+            ..eval
+        };
         assert_eq!(
             index.reinsert_stories(&eval, [story.id])?,
             vec![ScrapePersistResult::MergedWithExistingStory]
         );
         let story = index
-            .fetch_one::<Shard>(&StoryQuery::from_search(&eval.tagger, "rust"))?
+            .fetch_one::<Shard>(&StoryQuery::UrlSearch(story.url))?
             .expect("Missing story");
         assert_eq!(story.title, "I love Rust");
+        assert_eq!(story.tags, TagSet::from_iter(["love", "rust"]));
 
         let counts = index.story_count()?;
         assert_eq!(counts.total.story_count, 1);
@@ -1224,10 +1338,111 @@ mod test {
             [reddit_story("story-3", "subreddit", date, "Title 3", &url)],
         )?;
 
-        index.insert_scrapes(&eval, batch.clone())?;
+        // Every scrape is identical to the stored copy and already part of its story's document
+        let res = index.insert_scrapes(&eval, batch.clone())?;
+        assert_eq!(res.len(), 30);
+        assert!(res
+            .iter()
+            .all(|res| *res == ScrapePersistResult::AlreadyPartOfExistingStory));
 
         let front_page = index.fetch_count(&StoryQuery::FrontPage, 100)?;
         assert_eq!(30, front_page);
+        let story = index
+            .fetch_one::<Shard>(&StoryQuery::UrlSearch(url))?
+            .expect("Missing story");
+        assert_eq!(story.scrapes.len(), 2);
+
+        Ok(())
+    }
+
+    /// Merging a scrape that doesn't change the story leaves its document alone, while a scrape that changes the
+    /// score, title or tags rewrites it.
+    #[rstest]
+    fn test_merge_unchanged_story(
+        _enable_tracing: &bool,
+    ) -> Result<(), Box<dyn std::error::Error>> {
+        use ScrapePersistResult::*;
+
+        let mut index = StoryIndex::new(PersistLocation::Memory)?;
+        let eval = StoryEvaluator::new_for_test();
+        let url = StoryUrl::parse("http://example.com").expect("URL");
+        let date = StoryDate::year_month_day(2020, 1, 1).expect("Date failed");
+        let fetch = |index: &StoryIndex| {
+            index
+                .fetch_one::<Shard>(&StoryQuery::UrlSearch(url.clone()))
+                .map(|story| story.expect("Missing story"))
+        };
+
+        assert_eq!(
+            index.insert_scrapes(&eval, [rust_story_hn()])?,
+            vec![NewStory]
+        );
+        let story = fetch(&index)?;
+
+        // Force the identical scrape through the merge path: the rebuilt document matches, so it isn't rewritten
+        assert_eq!(
+            index.insert_scrape_batch(&eval, [rust_story_hn()], &HashSet::new())?,
+            vec![AlreadyPartOfExistingStory]
+        );
+        let unchanged = fetch(&index)?;
+        assert_eq!(unchanged.title, story.title);
+        assert_eq!(unchanged.score, story.score);
+        assert_eq!(unchanged.tags, story.tags);
+        assert_eq!(index.story_count()?.total.story_count, 1);
+
+        // A busy comment thread changes only the score
+        let mut busy =
+            HackerNewsStory::new_with_defaults("story1", date, "I love Rust", url.clone());
+        busy.data.comments = 200;
+        let busy: TypedScrape = busy.into();
+        assert_eq!(
+            index.insert_scrapes(&eval, [busy])?,
+            vec![MergedWithExistingStory]
+        );
+        let rescored = fetch(&index)?;
+        assert!(rescored.score > story.score);
+        assert_eq!(rescored.title, story.title);
+
+        // A new title changes the title and the tags
+        assert_eq!(
+            index.insert_scrapes(&eval, [hn_story("story1", date, "I love Go", &url)])?,
+            vec![MergedWithExistingStory]
+        );
+        let retitled = fetch(&index)?;
+        assert_eq!(retitled.title, "I love Go");
+        assert_eq!(retitled.tags, TagSet::from_iter(["golang"]));
+        assert_eq!(index.story_count()?.total.story_count, 1);
+
+        Ok(())
+    }
+
+    /// A scrape that made it into the scrape store but never into the index (ie: indexing failed after the scrape was
+    /// stored) must still be indexed the next time it is scraped, even though it matches the stored copy.
+    #[rstest]
+    fn test_insert_stored_but_unindexed(
+        _enable_tracing: &bool,
+    ) -> Result<(), Box<dyn std::error::Error>> {
+        let mut index = StoryIndex::new(PersistLocation::Memory)?;
+        let eval = StoryEvaluator::new_for_test();
+
+        index.scrape_db.insert_scrape_batch([&rust_story_hn()])?;
+        assert_eq!(index.story_count()?.total.story_count, 0);
+
+        assert_eq!(
+            index.insert_scrapes(&eval, [rust_story_hn()])?,
+            vec![ScrapePersistResult::NewStory]
+        );
+        let story = index
+            .fetch_one::<Shard>(&StoryQuery::from_search(&eval.tagger, "rust"))?
+            .expect("Missing story");
+        assert_eq!(story.title, "I love Rust");
+
+        // The same scrape again is now both stored and indexed, so it's skipped
+        assert_eq!(
+            index.insert_scrapes(&eval, [rust_story_hn()])?,
+            vec![ScrapePersistResult::AlreadyPartOfExistingStory]
+        );
+        assert_eq!(index.story_count()?.total.story_count, 1);
 
         Ok(())
     }
@@ -9,7 +9,7 @@ use tantivy::{
 
 use progscrape_scrapers::{ScrapeId, StoryDate};
 
-use std::collections::HashSet;
+use std::collections::{HashMap, HashSet};
 use std::hash::Hash;
 use std::ops::RangeBounds;
 use std::sync::RwLock;
@@ -47,6 +47,20 @@ pub struct StoryInsert {
     pub scrape_ids: Vec<String>,
 }
 
+impl StoryInsert {
+    /// Would inserting this document leave the already-indexed `existing` story unchanged? Merges only ever add
+    /// scrapes, so comparing the scrape count is enough, and tags are compared by count and membership.
+    pub fn matches(&self, existing: &StoryFetch) -> bool {
+        self.url == existing.url
+            && self.title == existing.title
+            && self.date == existing.date
+            && self.score == existing.score
+            && self.scrape_ids.len() == existing.scrape_ids.len()
+            && self.tags.iter().count() == existing.tags.len()
+            && existing.tags.iter().all(|tag| self.tags.contains(tag))
+    }
+}
+
 #[derive(Debug)]
 pub struct StoryFetch {
     pub url: String,
@@ -316,41 +330,51 @@ impl StoryIndexShard {
     /// Given a set of `StoryLookupId`s, computes the documents that match them.
     pub fn lookup_stories(
         &self,
-        mut stories: HashSet<StoryLookupId>,
+        stories: HashSet<StoryLookupId>,
         date_range: impl RangeBounds<i64>,
     ) -> Result<Vec<StoryLookup>, PersistError> {
+        // Group the lookups by hash so each segment only needs to be scanned once
+        let mut wanted: HashMap<i64, Vec<StoryLookupId>> = HashMap::new();
+        for story in stories {
+            wanted.entry(story.url_norm_hash).or_default().push(story);
+        }
         self.with_searcher(move |searcher, _| {
             let mut result = vec![];
             for (segment_ord, segment_reader) in searcher.segment_readers().iter().enumerate() {
+                // Early exit optimization
+                if wanted.is_empty() {
+                    break;
+                }
                 let index = segment_reader
                     .fast_fields()
                     .i64(self.schema.url_norm_hash_field)?;
-                let date = segment_reader.fast_fields().i64(self.schema.date_field)?;
                 let (min, max) = (index.min_value(), index.max_value());
-                stories.retain(|story| {
-                    if min <= story.url_norm_hash && max >= story.url_norm_hash {
-                        for i in segment_reader.doc_ids_alive() {
-                            if index.get_val(i) == story.url_norm_hash {
-                                let date = date.get_val(i) - story.date;
-                                if !date_range.contains(&date) {
-                                    return true;
-                                }
+                if !wanted.keys().any(|hash| (min..=max).contains(hash)) {
+                    continue;
+                }
+                let date = segment_reader.fast_fields().i64(self.schema.date_field)?;
+                for i in segment_reader.doc_ids_alive() {
+                    let hash = index.get_val(i);
+                    if let Some(candidates) = wanted.get_mut(&hash) {
+                        let doc_date = date.get_val(i);
+                        candidates.retain(|story| {
+                            if date_range.contains(&(doc_date - story.date)) {
                                 result.push(StoryLookup::Found(
                                     *story,
                                     DocAddress::new(segment_ord as u32, i),
                                 ));
-                                return false;
+                                false
+                            } else {
+                                true
                             }
+                        });
+                        if candidates.is_empty() {
+                            wanted.remove(&hash);
                         }
                     }
-                    true
-                });
-                // Early exit optimization
-                if stories.is_empty() {
-                    break;
                 }
             }
-            result.extend(stories.into_iter().map(StoryLookup::Unfound));
+            result.extend(wanted.into_values().flatten().map(StoryLookup::Unfound));
             Ok(result)
         })
     }
@@ -368,3 +392,13 @@ pub(crate) fn tokenize_domain(domain: &str) -> Vec<Token> {
     };
     tokens
 }
+
+/// Tokenize a domain directly into search terms for `field`, without materializing intermediate tokens.
+pub(crate) fn domain_terms(field: Field, domain: &str) -> Vec<Term> {
+    let mut token_stream = SimpleTokenizer.token_stream(domain);
+    let mut terms = vec![];
+    while token_stream.advance() {
+        terms.push(Term::from_field_text(field, &token_stream.token().text));
+    }
+    terms
+}
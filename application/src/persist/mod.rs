@@ -179,9 +179,17 @@ impl StoryQuery {
 
     fn try_domain_or_url(search: &str) -> Option<StoryQuery> {
         // Only test a domain search if the search contains a domain-like char
-        if search.contains('.') || search.contains(':') {
+        if search.contains(['.', ':']) {
             let url = if search.contains(':') {
                 StoryUrl::parse(search)
+            } else if search
+                .split(['/', '\\', '?', '#'])
+                .next()
+                .unwrap_or_default()
+                .contains(' ')
+            {
+                // A space can never appear in a host, so skip the parse for multi-word searches like "node.js tutorial"
+                None
             } else {
                 // TODO: We probably don't want to re-parse this as a URL, but it's the fastest way to normalize it
                 StoryUrl::parse(format!("http://{}", search))
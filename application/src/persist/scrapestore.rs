@@ -1,5 +1,5 @@
 use std::{
-    collections::HashMap,
+    collections::{HashMap, HashSet},
     sync::{Arc, RwLock},
 };
 
@@ -63,10 +63,11 @@ impl ScrapeStore {
                     db
                 }
             };
+            // The schema only needs to be ensured once per opened shard
+            db.create_table::<ScrapeCacheEntry>()?;
+            db.create_unique_index::<ScrapeCacheEntry>("idx_id", &["id"])?;
             lock.entry(shard).or_insert(Arc::new(db))
         };
-        db.create_table::<ScrapeCacheEntry>()?;
-        db.create_unique_index::<ScrapeCacheEntry>("idx_id", &["id"])?;
         Ok(db.clone())
     }
 
@@ -78,11 +79,30 @@ impl ScrapeStore {
         &self,
         iter: I,
     ) -> Result<(), PersistError> {
+        self.store_scrape_batch(iter, false)?;
+        Ok(())
+    }
+
+    /// Like `insert_scrape_batch`, but scrapes that are already stored with identical contents are not rewritten.
+    /// Returns the IDs of those unchanged scrapes.
+    pub fn insert_changed_scrape_batch<'a, I: IntoIterator<Item = &'a TypedScrape>>(
+        &self,
+        iter: I,
+    ) -> Result<HashSet<ScrapeId>, PersistError> {
+        self.store_scrape_batch(iter, true)
+    }
+
+    fn store_scrape_batch<'a, I: IntoIterator<Item = &'a TypedScrape>>(
+        &self,
+        iter: I,
+        skip_unchanged: bool,
+    ) -> Result<HashSet<ScrapeId>, PersistError> {
         let mut per_shard: HashMap<Shard, Vec<&TypedScrape>> = HashMap::new();
         for item in iter {
             let shard = Shard::from_date_time(item.date);
             per_shard.entry(shard).or_default().push(item);
         }
+        let mut unchanged = HashSet::new();
         for (shard, stories) in per_shard {
             let db = self.open_shard(shard)?;
             let mut batch = vec![];
@@ -94,9 +114,27 @@ impl ScrapeStore {
                     json,
                 });
             }
+            if skip_unchanged {
+                let keys: Vec<String> = batch.iter().map(|entry| entry.id.clone()).collect();
+                let existing: HashMap<String, String> = db
+                    .load_batch::<ScrapeCacheEntry>(&keys)?
+                    .into_iter()
+                    .map(|entry| (entry.id, entry.json))
+                    .collect();
+                batch.retain(|entry| {
+                    if existing.get(&entry.id) == Some(&entry.json) {
+                        if let Some(id) = ScrapeId::from_string(&entry.id) {
+                            unchanged.insert(id);
+                        }
+                        false
+                    } else {
+                        true
+                    }
+                });
+            }
             db.store_batch(batch)?;
         }
-        Ok(())
+        Ok(unchanged)
     }
 
     pub fn fetch_scrape(
@@ -118,15 +156,27 @@ impl ScrapeStore {
         &self,
         iter: I,
     ) -> Result<HashMap<ScrapeId, Option<TypedScrape>>, PersistError> {
-        let mut map = HashMap::new();
+        let mut per_shard: HashMap<Shard, Vec<ScrapeId>> = HashMap::new();
         for id in iter {
-            let db = self.open_shard(id.shard)?;
-            let scrape = db.load::<ScrapeCacheEntry>(id.id.to_string())?;
-            if let Some(scrape) = scrape {
-                let typed_scrape = serde_json::from_str(&scrape.json)?;
-                map.insert(id.id.clone(), typed_scrape);
-            } else {
-                map.insert(id.id.clone(), None);
+            per_shard.entry(id.shard).or_default().push(id.id);
+        }
+        let mut map = HashMap::new();
+        for (shard, ids) in per_shard {
+            let db = self.open_shard(shard)?;
+            // Load the whole shard's worth of scrapes in one query rather than one query per scrape
+            let keys: Vec<String> = ids.iter().map(ScrapeId::to_string).collect();
+            let found: HashMap<String, ScrapeCacheEntry> = db
+                .load_batch::<ScrapeCacheEntry>(&keys)?
+                .into_iter()
+                .map(|scrape| (scrape.id.clone(), scrape))
+                .collect();
+            for (id, key) in ids.into_iter().zip(keys) {
+                if let Some(scrape) = found.get(&key) {
+                    let typed_scrape = serde_json::from_str(&scrape.json)?;
+                    map.insert(id, typed_scrape);
+                } else {
+                    map.insert(id, None);
+                }
             }
         }
         Ok(map)
@@ -209,4 +259,23 @@ mod test {
 
         Ok(())
     }
+
+    #[rstest]
+    fn test_insert_unchanged(_enable_tracing: &bool) -> Result<(), Box<dyn std::error::Error>> {
+        let store = ScrapeStore::new(PersistLocation::Memory)?;
+
+        let samples = progscrape_scrapers::load_sample_scrapes(&ScrapeConfig::default());
+        let first = &samples[0..100];
+
+        // Nothing is stored yet, so nothing is unchanged
+        assert!(store.insert_changed_scrape_batch(first)?.is_empty());
+
+        // Storing the same scrapes again changes nothing
+        let unchanged = store.insert_changed_scrape_batch(first)?;
+        for scrape in first {
+            assert!(unchanged.contains(&scrape.id));
+        }
+
+        Ok(())
+    }
 }
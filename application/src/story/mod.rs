@@ -124,18 +124,21 @@ impl<S> Story<S> {
 
     pub fn render_tags(&self, tagger: &StoryTagger) -> Vec<String> {
         let host = self.url.host();
-        let mut tags = vec![];
+        let mut tags = Vec::with_capacity(self.tags.set.len() + 1);
         // This is mainly for our blog entries that explicitly use "progscrape" as a host
         if host.contains('.') {
             tags.push(host.to_owned());
         }
-        tags.extend(tagger.make_display_tags(self.tags.dump()));
+        // Sort by reference so the only per-tag allocation is the display tag itself
+        tags.extend(tagger.make_display_tags(self.tags.iter().sorted()));
         tags
     }
 
     pub fn render(&self, eval: &StoryEvaluator, order: usize) -> StoryRender {
         let mut sources = TypedScrapeMap::new();
+        let mut comments = TypedScrapeMap::new();
         for (id, _) in &self.scrapes {
+            comments.set(id.source, Some(id.comments_url()));
             sources.set(id.source, Some(id.clone()));
         }
         StoryRender {
@@ -149,6 +152,7 @@ impl<S> Story<S> {
             tags: self.render_tags(&eval.tagger),
             html: Default::default(),
             sources,
+            comments,
         }
     }
 }
@@ -176,7 +180,13 @@ impl TagSet {
     }
 
     pub fn add(&mut self, tag: impl AsRef<str>) {
-        self.set.insert(tag.as_ref().to_ascii_lowercase());
+        let tag = tag.as_ref();
+        // Most tags arrive already lowercased, and many are repeats, so only allocate for tags we don't have
+        if tag.bytes().any(|b| b.is_ascii_uppercase()) {
+            self.set.insert(tag.to_ascii_lowercase());
+        } else if !self.set.contains(tag) {
+            self.set.insert(tag.to_owned());
+        }
     }
 
     pub fn collect(&self) -> Vec<String> {
@@ -192,6 +202,16 @@ impl TagSet {
     }
 }
 
+impl<S: AsRef<str>> Extend<S> for TagSet {
+    fn extend<T: IntoIterator<Item = S>>(&mut self, iter: T) {
+        let iter = iter.into_iter();
+        self.set.reserve(iter.size_hint().0);
+        for tag in iter {
+            self.add(tag);
+        }
+    }
+}
+
 impl<'a> IntoIterator for &'a TagSet {
     type IntoIter = <&'a HashSet<String> as IntoIterator>::IntoIter;
     type Item = <&'a HashSet<String> as IntoIterator>::Item;
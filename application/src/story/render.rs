@@ -19,4 +19,6 @@ pub struct StoryRender {
     /// Only for our blog posts
     pub html: String,
     pub sources: TypedScrapeMap<Option<ScrapeId>>,
+    /// Comment URLs for each of `sources`, computed once at render time.
+    pub comments: TypedScrapeMap<Option<String>>,
 }
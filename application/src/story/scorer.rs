@@ -55,6 +55,8 @@ impl Serialize for StoryScore {
 
 pub struct StoryScorer {
     config: StoryScoreConfig,
+    /// The age breakpoints from the config, computed once up-front.
+    breakpoints: [StoryDuration; 2],
 }
 
 trait ServiceScorer {}
@@ -65,6 +67,9 @@ impl StoryScorer {
     pub fn new(config: &StoryScoreConfig) -> Self {
         Self {
             config: config.clone(),
+            breakpoints: config
+                .age_breakpoint_days
+                .map(|days| StoryDuration::days(days as i64)),
         }
     }
 
@@ -78,8 +83,7 @@ impl StoryScorer {
 
     #[inline(always)]
     pub fn score_age(&self, age: StoryDuration) -> f32 {
-        let breakpoint1 = StoryDuration::days(self.config.age_breakpoint_days[0] as i64);
-        let breakpoint2 = StoryDuration::days(self.config.age_breakpoint_days[1] as i64);
+        let [breakpoint1, breakpoint2] = self.breakpoints;
         let hour_score0 = self.config.hour_scores[0];
         let hour_score1 = self.config.hour_scores[1];
         let hour_score2 = self.config.hour_scores[2];
@@ -113,7 +117,7 @@ impl StoryScorer {
     ) {
         use StoryScore::*;
 
-        let url = core.url;
+        let host = core.url.host();
 
         let source = scrape.id.source;
         if let Some(rank) = core.rank {
@@ -126,10 +130,7 @@ impl StoryScorer {
         if boost > f32::EPSILON {
             accum(Source(source), boost);
         }
-        if url.host().contains("gfycat")
-            || url.host().contains("imgur")
-            || url.host().contains("i.reddit.com")
-        {
+        if host.contains("gfycat") || host.contains("imgur") || host.contains("i.reddit.com") {
             if source == ScrapeSource::HackerNews {
                 accum(ImageLink, -5.0);
             } else {
@@ -145,7 +146,7 @@ impl StoryScorer {
             }
             TypedScrape::Reddit(reddit) => {
                 // Penalize Reddit self links
-                if url.host().contains("reddit.com") {
+                if host.contains("reddit.com") {
                     accum(SelfLink, -20.0);
                 }
 
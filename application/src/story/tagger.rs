@@ -1,5 +1,7 @@
+use std::borrow::Cow;
 use std::collections::{HashMap, HashSet};
 
+use aho_corasick::{AhoCorasick, MatchKind};
 use itertools::Itertools;
 use serde::{Deserialize, Serialize};
 
@@ -33,7 +35,7 @@ pub struct TaggerConfig {
 #[derive(Debug)]
 struct TagRecord {
     output: String,
-    implies: Vec<String>,
+    implies: Option<String>,
 }
 
 #[derive(Debug, Hash, PartialEq, Eq, PartialOrd, Ord)]
@@ -69,19 +71,26 @@ pub struct StoryTagger {
     records: Vec<TagRecord>,
     /// Maps tags to internal symbols
     forward: HashMap<String, usize>,
-    /// Forward-maps multi-token tags.
-    forward_multi: HashMap<MultiTokenTag, usize>,
-    /// Exclusion tokens that mute other tags.
-    exclusions: HashMap<MultiTokenTag, String>,
+    /// Forward-maps multi-token tags, keyed by their first token so each position in a title only needs one lookup.
+    forward_multi: HashMap<String, Vec<(MultiTokenTag, usize)>>,
+    /// Exclusion tokens that mute other tags, keyed by their first token.
+    exclusions: HashMap<String, Vec<(MultiTokenTag, String)>>,
     /// Maps internal symbols to tags (only required in a handful of cases)
     backward: HashMap<String, String>,
     ///
     symbols: HashMap<String, usize>,
+    /// Matches every symbol in a single pass. Pattern IDs index into `symbol_records`.
+    symbol_matcher: AhoCorasick,
+    symbol_records: Vec<usize>,
 }
 
 impl StoryTagger {
     // TODO: These methods allocate a lot of temporaries that probably don't need to be allocated
     fn compute_tag(tag: &str) -> Vec<String> {
+        // Titles are lowercased before matching, so the tables must be keyed on lowercase tags as well
+        if tag.chars().any(char::is_uppercase) {
+            return Self::compute_tag(&tag.to_lowercase());
+        }
         // Optional hyphen/space
         if tag.contains("(-)") {
             let mut v = Self::compute_tag(&tag.replace("(-)", "-"));
@@ -121,6 +130,9 @@ impl StoryTagger {
             backward: HashMap::new(),
             records: vec![],
             symbols: HashMap::new(),
+            // Built below, once all the symbols are known
+            symbol_matcher: AhoCorasick::new(Vec::<&str>::new()).expect("Empty matcher"),
+            symbol_records: vec![],
             exclusions: HashMap::new(),
         };
         for tags in config.tags.values() {
@@ -134,14 +146,19 @@ impl StoryTagger {
                         tag: s.split_ascii_whitespace().map(str::to_owned).collect(),
                     });
                 for exclude in excludes {
-                    new.exclusions.insert(exclude, primary.clone());
+                    if let Some(first) = exclude.tag.first() {
+                        new.exclusions
+                            .entry(first.clone())
+                            .or_default()
+                            .push((exclude, primary.clone()));
+                    }
                 }
                 let record = TagRecord {
                     output: match tags.internal {
                         Some(ref s) => s.clone(),
                         None => primary,
                     },
-                    implies: tags.implies.clone().into_iter().collect(),
+                    implies: tags.implies.clone(),
                 };
                 if let Some(internal) = &tags.internal {
                     new.backward.insert(internal.clone(), tag.clone());
@@ -154,7 +171,12 @@ impl StoryTagger {
                         let tag = MultiTokenTag {
                             tag: tag.split_ascii_whitespace().map(str::to_owned).collect(),
                         };
-                        new.forward_multi.insert(tag, new.records.len());
+                        if let Some(first) = tag.tag.first() {
+                            new.forward_multi
+                                .entry(first.clone())
+                                .or_default()
+                                .push((tag, new.records.len()));
+                        }
                     } else {
                         new.forward.insert(tag, new.records.len());
                     }
@@ -164,43 +186,94 @@ impl StoryTagger {
             }
         }
 
+        // Where symbols overlap, the longest one wins
+        let (symbols, records): (Vec<_>, Vec<_>) = new
+            .symbols
+            .iter()
+            .sorted()
+            .map(|(symbol, rec)| (symbol.as_str(), *rec))
+            .unzip();
+        new.symbol_matcher = AhoCorasick::builder()
+            .match_kind(MatchKind::LeftmostLongest)
+            .build(symbols)
+            .expect("Failed to build symbol matcher");
+        new.symbol_records = records;
+
+        // Where multi-token tags share a first token, try the longest first
+        for multis in new.forward_multi.values_mut() {
+            multis.sort_by(|a, b| b.0.tag.len().cmp(&a.0.tag.len()).then(a.cmp(b)));
+        }
+
+        // The tables are read-only from here on, so drop any spare capacity left over from building them
+        new.records.shrink_to_fit();
+        new.forward.shrink_to_fit();
+        new.forward_multi.shrink_to_fit();
+        new.exclusions.shrink_to_fit();
+        new.backward.shrink_to_fit();
+        new.symbols.shrink_to_fit();
+
         new
     }
 
     pub fn tag<T: TagAcceptor>(&self, s: &str, tags: &mut T) {
-        let s = s.to_lowercase();
-
-        // Clean up single quotes to a standard type
-        let s = s.replace(
-            |c| {
-                c == '`' || c == '\u{2018}' || c == '\u{2019}' || c == '\u{201a}' || c == '\u{201b}'
-            },
-            "'",
-        );
+        // Lowercase and clean up single quotes to a standard type. Most titles are plain ASCII, which lets us skip
+        // the Unicode case tables and the non-ASCII quotes entirely.
+        let s = if s.is_ascii() {
+            s.to_ascii_lowercase().replace('`', "'")
+        } else {
+            s.to_lowercase().replace(
+                |c| {
+                    c == '`'
+                        || c == '\u{2018}'
+                        || c == '\u{2019}'
+                        || c == '\u{201a}'
+                        || c == '\u{201b}'
+                },
+                "'",
+            )
+        };
 
-        // Replace possessive with non-possessive
-        let mut s = s.replace("'s", "");
+        // Replace possessive with non-possessive, only allocating if there's something to replace
+        let s = if s.contains("'s") {
+            s.replace("'s", "")
+        } else {
+            s
+        };
 
-        // First, we replace all symbols and generate tags
-        for (symbol, rec) in &self.symbols {
-            if s.contains(symbol) {
-                s = s.replace(symbol, " ");
-                tags.tag(&self.records[*rec].output);
-                for implies in &self.records[*rec].implies {
-                    tags.tag(implies);
-                }
+        // First, we replace all symbols and generate tags, finding all of them in one pass over the string
+        let mut without_symbols = String::with_capacity(s.len());
+        let mut last = 0;
+        for m in self.symbol_matcher.find_iter(&s) {
+            let rec = &self.records[self.symbol_records[m.pattern().as_usize()]];
+            tags.tag(&rec.output);
+            for implies in &rec.implies {
+                tags.tag(implies);
             }
+            without_symbols += &s[last..m.start()];
+            without_symbols.push(' ');
+            last = m.end();
         }
+        without_symbols += &s[last..];
+        let s = without_symbols;
 
         // Next, we check all the word-like tokens for potential matches
         let tokens_vec = s
             .split_ascii_whitespace()
-            .map(|s| s.replace(|c: char| !c.is_alphanumeric() && c != '-', ""))
+            .map(|s| {
+                // Most tokens are already clean, so only allocate for the ones that need stripping
+                let is_token_char = |c: char| c.is_alphanumeric() || c == '-';
+                if s.chars().all(is_token_char) {
+                    Cow::Borrowed(s)
+                } else {
+                    Cow::Owned(s.replace(|c: char| !is_token_char(c), ""))
+                }
+            })
             .filter(|s| !s.is_empty())
             .collect_vec();
         let mut tokens = tokens_vec.as_slice();
 
-        let mut mutes = HashMap::new();
+        // Muted tags borrow from `self.exclusions`, so tracking them doesn't allocate
+        let mut mutes: HashMap<&str, usize> = HashMap::new();
 
         'outer: while !tokens.is_empty() {
             mutes.retain(|_k, v| {
@@ -211,12 +284,14 @@ impl StoryTagger {
                     true
                 }
             });
-            for (exclusion, tag) in &self.exclusions {
+            let exclusions = self.exclusions.get(&*tokens[0]).into_iter().flatten();
+            for (exclusion, tag) in exclusions {
                 if exclusion.matches(tokens) {
-                    mutes.insert(tag.clone(), exclusion.tag.len() - 1);
+                    mutes.insert(tag, exclusion.tag.len() - 1);
                 }
             }
-            for (multi, rec) in &self.forward_multi {
+            let multis = self.forward_multi.get(&*tokens[0]).into_iter().flatten();
+            for (multi, rec) in multis {
                 if multi.chomp(&mut tokens) {
                     let rec = &self.records[*rec];
                     tags.tag(&rec.output);
@@ -226,8 +301,9 @@ impl StoryTagger {
                     continue 'outer;
                 }
             }
-            if let Some(rec) = self.forward.get(&tokens[0]) {
-                if !mutes.contains_key(&tokens[0]) {
+            if let Some(rec) = self.forward.get(&*tokens[0]) {
+                // Nothing is muted for most titles, so don't bother hashing the token a second time
+                if mutes.is_empty() || !mutes.contains_key(&*tokens[0]) {
                     let rec = &self.records[*rec];
                     tags.tag(&rec.output);
                     for implies in &rec.implies {
@@ -258,11 +334,19 @@ impl StoryTagger {
 
     /// Given a raw, indexed tag, output a tag that is suitable for display purposes (ie: cplusplus -> c++).
     pub fn make_display_tag<'a, S: AsRef<str> + 'a>(&'a self, s: S) -> String {
-        let lowercase = s.as_ref().to_lowercase();
-        if let Some(backward) = self.backward.get(&lowercase) {
-            backward.clone()
+        let s = s.as_ref();
+        // Indexed tags are already lowercase, so avoid allocating a lowercase copy just to look it up
+        if s.chars().any(char::is_uppercase) {
+            let lowercase = s.to_lowercase();
+            match self.backward.get(&lowercase) {
+                Some(backward) => backward.clone(),
+                None => lowercase,
+            }
         } else {
-            lowercase
+            self.backward
+                .get(s)
+                .cloned()
+                .unwrap_or_else(|| s.to_owned())
         }
     }
 
@@ -362,6 +446,24 @@ pub(crate) mod test {
         }
     }
 
+    /// Ensure that tags configured with uppercase characters still match the lowercased title.
+    #[test]
+    fn test_uppercase_config() {
+        let config: TaggerConfig = serde_json::from_value(json!({
+            "tags": {
+                "testing": {
+                    "WebGPU": {},
+                    "F#": {"internal": "fsharp", "symbol": true},
+                }
+            }
+        }))
+        .expect("Failed to parse test config");
+        let tagger = StoryTagger::new(&config);
+        let mut tag_set = TagSet::new();
+        tagger.tag("WebGPU from F#", &mut tag_set);
+        assert_eq!(tag_set.collect(), vec!["fsharp", "webgpu"]);
+    }
+
     #[rstest]
     #[case("I love rust!", &["rust"])]
     #[case("Good old video", &["video"])]
@@ -376,6 +478,7 @@ pub(crate) mod test {
     #[case("C# is hard", &["csharp"])]
     #[case("C++ is hard", &["cplusplus"])]
     #[case("AT&T has an ampersand", &["atandt"])]
+    #[case("C++, C# and F# on .NET", &["cplusplus", "csharp", "dotnet", "fsharp"])]
     fn test_tag_extraction(tagger: StoryTagger, #[case] s: &str, #[case] tags: &[&str]) {
         let mut tag_set = TagSet::new();
         tagger.tag(s, &mut tag_set);
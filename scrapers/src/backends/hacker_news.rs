@@ -90,87 +90,86 @@ struct HackerNewsInfoLine {
     date: StoryDate,
 }
 
-#[derive(Debug)]
-enum HackerNewsNode {
-    StoryLine(HackerNewsStoryLine),
-    InfoLine(HackerNewsInfoLine),
+/// Parse the digits out of a string like "123 points" or "45 comments" without allocating.
+fn extract_number(s: &str) -> Result<u32, String> {
+    let mut digits = s.bytes().filter(u8::is_ascii_digit).peekable();
+    if digits.peek().is_some() {
+        let n = digits.try_fold(0_u32, |n, d| {
+            n.checked_mul(10)?.checked_add((d - b'0') as u32)
+        });
+        if let Some(n) = n {
+            return Ok(n);
+        }
+    }
+    Err(format!("Failed to parse number: '{}'", s))
 }
 
 impl HackerNewsScraper {
-    fn map_node_to_story(&self, p: &Parser, node: &HTMLTag) -> Result<HackerNewsNode, String> {
-        if find_first(p, node, "table").is_some() {
-            return Err("Story table cannot contain other tables".to_string());
+    /// Map a `tr.athing` row to the story line.
+    fn map_story_line(&self, p: &Parser, node: &HTMLTag) -> Result<HackerNewsStoryLine, String> {
+        let titleline =
+            find_first(p, node, ".titleline").ok_or_else(|| "Missing titleline".to_string())?;
+        if find_first(p, node, ".votelinks").is_none() {
+            return Err("Missing votelinks".to_string());
         }
-
-        fn extract_number(s: &str) -> Result<u32, String> {
-            str::parse(&s.replace(|c: char| !c.is_ascii_digit(), ""))
-                .map_err(|_| format!("Failed to parse number: '{}'", s))
+        let first_link = find_first(p, titleline, "a")
+            .ok_or_else(|| "Failed to query first link".to_string())?;
+        let title = unescape_entities(first_link.inner_text(p).borrow());
+        let mut url = unescape_entities(
+            &get_attribute(p, first_link, "href")
+                .ok_or_else(|| "Failed to get href".to_string())?,
+        );
+        if url.starts_with("item?") {
+            url.insert_str(0, "https://news.ycombinator.com/");
         }
+        let url = StoryUrl::parse(&url).ok_or_else(|| format!("Failed to parse URL {}", url))?;
+        let id = get_attribute(p, node, "id").ok_or_else(|| "Failed to get id node".to_string())?;
+        let rank = find_first(p, node, ".rank").ok_or_else(|| "Failed to get rank".to_string())?;
+        let position = rank
+            .inner_text(p)
+            .trim_end_matches('.')
+            .parse()
+            .or(Err("Failed to parse rank".to_string()))?;
+        Ok(HackerNewsStoryLine {
+            id,
+            position,
+            url,
+            title,
+        })
+    }
 
-        return if let Some(titleline) = find_first(p, node, ".titleline") {
-            if find_first(p, node, ".votelinks").is_none() {
-                return Err("Missing votelinks".to_string());
+    /// Map a `.subtext` cell to the info line.
+    fn map_info_line(&self, p: &Parser, node: &HTMLTag) -> Result<HackerNewsInfoLine, String> {
+        let age_node =
+            find_first(p, node, ".age").ok_or_else(|| "Failed to query .age".to_string())?;
+        let date = get_attribute(p, age_node, "title")
+            .ok_or_else(|| "Failed to get age title".to_string())?
+            + "Z";
+        let date =
+            StoryDate::parse_from_rfc3339(&date).ok_or_else(|| "Failed to map date".to_string())?;
+        let mut comments = None;
+        for node in html_tag_iterator(p, node.query_selector(p, "a")) {
+            let text = node.inner_text(p);
+            if text.contains("comment") {
+                comments = Some(extract_number(text.borrow())?);
+            } else if text.contains("discuss") {
+                comments = Some(0);
             }
-            let first_link = find_first(p, titleline, "a")
-                .ok_or_else(|| "Failed to query first link".to_string())?;
-            let title = unescape_entities(first_link.inner_text(p).borrow());
-            let mut url = unescape_entities(
-                &get_attribute(p, first_link, "href")
-                    .ok_or_else(|| "Failed to get href".to_string())?,
-            );
-            if url.starts_with("item?") {
-                url.insert_str(0, "https://news.ycombinator.com/");
-            }
-            let url = StoryUrl::parse(&url).ok_or(format!("Failed to parse URL {}", url))?;
-            let id =
-                get_attribute(p, node, "id").ok_or_else(|| "Failed to get id node".to_string())?;
-            let rank =
-                find_first(p, node, ".rank").ok_or_else(|| "Failed to get rank".to_string())?;
-            let position = rank
-                .inner_text(p)
-                .trim_end_matches('.')
-                .parse()
-                .or(Err("Failed to parse rank".to_string()))?;
-            Ok(HackerNewsNode::StoryLine(HackerNewsStoryLine {
-                id,
-                position,
-                url,
-                title,
-            }))
-        } else if find_first(p, node, ".subtext").is_some() {
-            let age_node =
-                find_first(p, node, ".age").ok_or_else(|| "Failed to query .age".to_string())?;
-            let date = get_attribute(p, age_node, "title")
-                .ok_or_else(|| "Failed to get age title".to_string())?
-                + "Z";
-            let date = StoryDate::parse_from_rfc3339(&date)
-                .ok_or_else(|| "Failed to map date".to_string())?;
-            let mut comments = None;
-            for node in html_tag_iterator(p, node.query_selector(p, "a")) {
-                let text = node.inner_text(p);
-                if text.contains("comment") {
-                    comments = Some(extract_number(text.borrow())?);
-                } else if text.contains("discuss") {
-                    comments = Some(0);
-                }
-            }
-            let score_node = find_first(p, node, ".score")
-                .ok_or_else(|| "Failed to query .score".to_string())?;
-            let id = get_attribute(p, score_node, "id")
-                .ok_or_else(|| "Missing ID on score node".to_string())?
-                .trim_start_matches("score_")
-                .into();
-            let points = extract_number(score_node.inner_text(p).borrow())?;
-            let comments = comments.ok_or_else(|| "Missing comment count".to_string())?;
-            Ok(HackerNewsNode::InfoLine(HackerNewsInfoLine {
-                id,
-                comments,
-                points,
-                date,
-            }))
-        } else {
-            Err("Unknown node type".to_string())
-        };
+        }
+        let score_node =
+            find_first(p, node, ".score").ok_or_else(|| "Failed to query .score".to_string())?;
+        let id = get_attribute(p, score_node, "id")
+            .ok_or_else(|| "Missing ID on score node".to_string())?
+            .trim_start_matches("score_")
+            .into();
+        let points = extract_number(score_node.inner_text(p).borrow())?;
+        let comments = comments.ok_or_else(|| "Missing comment count".to_string())?;
+        Ok(HackerNewsInfoLine {
+            id,
+            comments,
+            points,
+            date,
+        })
     }
 
     fn tags_from_title(
@@ -210,12 +209,10 @@ impl Scraper for HackerNewsScraper {
         let mut errors = vec![];
         let mut story_lines = HashMap::new();
         let mut info_lines = HashMap::new();
-        for node in html_tag_iterator(p, dom.query_selector("tr")) {
-            match self.map_node_to_story(p, node) {
-                Ok(HackerNewsNode::InfoLine(x)) => {
-                    info_lines.insert(x.id.clone(), x);
-                }
-                Ok(HackerNewsNode::StoryLine(x)) => {
+        // Select the story rows and their info cells directly, rather than testing every row in the page
+        for node in html_tag_iterator(p, dom.query_selector(".athing")) {
+            match self.map_story_line(p, node) {
+                Ok(x) => {
                     story_lines.insert(x.id.clone(), x);
                 }
                 Err(e) => {
@@ -223,6 +220,16 @@ impl Scraper for HackerNewsScraper {
                 }
             }
         }
+        for node in html_tag_iterator(p, dom.query_selector(".subtext")) {
+            match self.map_info_line(p, node) {
+                Ok(x) => {
+                    info_lines.insert(x.id.clone(), x);
+                }
+                Err(e) => {
+                    errors.push(e);
+                }
+            }
+        }
         let mut stories = vec![];
         for (k, v) in story_lines {
             let info = info_lines.remove(&k);
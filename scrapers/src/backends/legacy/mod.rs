@@ -27,16 +27,17 @@ pub enum LegacyError {
 pub fn import_backup(file: &Path) -> Result<Vec<TypedScrape>, LegacyError> {
     let mut f = BufReader::new(File::open(file)?);
     let mut out: Vec<TypedScrape> = vec![];
+    // A single line buffer is reused for every record, and serde_json validates UTF-8 as it parses the bytes
+    let mut buf = vec![];
     'outer: loop {
-        let mut buf = vec![];
+        buf.clear();
         while !buf.ends_with("}\n".as_bytes()) {
             let read = f.read_until(b'\n', &mut buf)?;
             if read == 0 {
                 break 'outer;
             }
         }
-        let json = String::from_utf8(buf)?;
-        let scrape = serde_json::from_str(&json)?;
+        let scrape = serde_json::from_slice(&buf)?;
         out.push(scrape);
     }
 
@@ -1,5 +1,5 @@
 use serde::{ser::SerializeMap, Deserialize, Serialize};
-use std::{borrow::Cow, fmt::Debug};
+use std::{borrow::Cow, collections::HashSet, fmt::Debug};
 
 pub use self::def::ScrapeCore;
 pub(crate) use self::def::*;
@@ -30,7 +30,7 @@ macro_rules! scrapers {
                     ScrapeSource::$name => {
                         let scraper = <$package::$name as ScrapeSourceDef>::Scraper::default();
                         let (res, warnings) = scraper.scrape(&config.$package, input)?;
-                        Ok((res.into_iter().map(|x| x.into()).collect(), warnings))
+                        Ok((dedup_scrapes(res.into_iter().map(|x| x.into())), warnings))
                     },
                 )*
                 ScrapeSource::Other => unreachable!(),
@@ -318,6 +318,16 @@ macro_rules! scrapers {
     };
 }
 
+/// Drops repeated scrapes with the same ID in a single pass, keeping the first one seen and
+/// preserving the original order.
+fn dedup_scrapes(scrapes: impl IntoIterator<Item = TypedScrape>) -> Vec<TypedScrape> {
+    let mut seen = HashSet::new();
+    scrapes
+        .into_iter()
+        .filter(|scrape| seen.insert(scrape.id.clone()))
+        .collect()
+}
+
 impl From<TypedScrape> for (ScrapeId, TypedScrape) {
     fn from(val: TypedScrape) -> Self {
         (val.id.clone(), val)
@@ -435,4 +445,17 @@ pub mod test {
             assert!(scrape.date.year() == 2023 || scrape.date.year() == 2022);
         }
     }
+
+    #[test]
+    fn test_dedup_scrapes() {
+        let config = ScrapeConfig::default();
+        let file = files_by_source(ScrapeSource::HackerNews)[0];
+        let (scrapes, _) = scrape(&config, ScrapeSource::HackerNews, file).expect("Scrape failed");
+        let doubled = scrapes.iter().chain(scrapes.iter()).cloned();
+        let deduped = dedup_scrapes(doubled);
+        assert_eq!(
+            scrapes.iter().map(|s| s.id.clone()).collect::<Vec<_>>(),
+            deduped.iter().map(|s| s.id.clone()).collect::<Vec<_>>()
+        );
+    }
 }
@@ -1,7 +1,7 @@
 use std::{borrow::Cow, collections::HashMap};
 
 use serde::{Deserialize, Serialize};
-use serde_json::Value;
+use serde_json::{Map, Value};
 
 use super::{
     scrape_story, utils::html::unescape_entities, GenericScrape, ScrapeConfigSource, ScrapeCore,
@@ -112,71 +112,72 @@ impl ScrapeStory for RedditStory {
 }
 
 impl RedditScraper {
-    fn require_string(&self, data: &Value, key: &str) -> Result<String, String> {
-        Ok(data[key]
-            .as_str()
-            .ok_or(format!("Missing field {:?}", key))?
-            .to_owned())
+    fn require_str<'a>(&self, data: &'a Map<String, Value>, key: &str) -> Result<&'a str, String> {
+        data.get(key)
+            .and_then(Value::as_str)
+            .ok_or_else(|| format!("Missing field {:?}", key))
     }
 
-    fn optional_string(&self, data: &Value, key: &str) -> Result<String, String> {
-        Ok(data[key].as_str().unwrap_or_default().to_owned())
+    fn optional_str<'a>(&self, data: &'a Map<String, Value>, key: &str) -> &'a str {
+        data.get(key).and_then(Value::as_str).unwrap_or_default()
     }
 
     fn require_integer<T: TryFrom<i64> + TryFrom<u64>>(
         &self,
-        data: &Value,
+        data: &Map<String, Value>,
         key: &str,
     ) -> Result<T, String> {
-        if let Value::Number(n) = &data[key] {
-            if let Some(n) = n.as_u64() {
-                if let Ok(n) = n.try_into() {
-                    return Ok(n);
+        match data.get(key) {
+            Some(Value::Number(n)) => {
+                if let Some(n) = n.as_u64() {
+                    if let Ok(n) = n.try_into() {
+                        return Ok(n);
+                    }
                 }
-            }
-            if let Some(n) = n.as_i64() {
-                if let Ok(n) = n.try_into() {
-                    return Ok(n);
+                if let Some(n) = n.as_i64() {
+                    if let Ok(n) = n.try_into() {
+                        return Ok(n);
+                    }
                 }
-            }
-            if let Some(n) = n.as_f64() {
-                let n = n as i64;
-                if let Ok(n) = n.try_into() {
-                    return Ok(n);
+                if let Some(n) = n.as_f64() {
+                    let n = n as i64;
+                    if let Ok(n) = n.try_into() {
+                        return Ok(n);
+                    }
                 }
+                Err(format!(
+                    "Failed to parse {} as integer (value was {:?})",
+                    key, n
+                ))
             }
-            Err(format!(
-                "Failed to parse {} as integer (value was {:?})",
-                key, n
-            ))
-        } else {
-            Err(format!(
+            value => Err(format!(
                 "Missing or invalid field {:?} (value was {:?})",
-                key, data[key]
-            ))
+                key, value
+            )),
         }
     }
 
-    fn require_float(&self, data: &Value, key: &str) -> Result<f64, String> {
-        if let Value::Number(n) = &data[key] {
-            if let Some(n) = n.as_u64() {
-                return Ok(n as f64);
-            }
-            if let Some(n) = n.as_i64() {
-                return Ok(n as f64);
-            }
-            if let Some(n) = n.as_f64() {
-                return Ok(n);
+    fn require_float(&self, data: &Map<String, Value>, key: &str) -> Result<f64, String> {
+        match data.get(key) {
+            Some(Value::Number(n)) => {
+                if let Some(n) = n.as_u64() {
+                    return Ok(n as f64);
+                }
+                if let Some(n) = n.as_i64() {
+                    return Ok(n as f64);
+                }
+                if let Some(n) = n.as_f64() {
+                    return Ok(n);
+                }
+                Err(format!(
+                    "Failed to parse {} as float (value was {:?})",
+                    key, n
+                ))
             }
-            Err(format!(
-                "Failed to parse {} as float (value was {:?})",
-                key, n
-            ))
-        } else {
-            Err(format!(
+            value => Err(format!(
                 "Missing or invalid field {:?} (value was {:?})",
-                key, data[key]
-            ))
+                key, value
+            )),
         }
     }
 
@@ -186,36 +187,41 @@ impl RedditScraper {
         positions: &mut HashMap<String, u32>,
     ) -> Result<GenericScrape<<Self as Scraper>::Output>, String> {
         let kind = child["kind"].as_str();
+        // Resolve the data object once so each field below is a single map lookup
         let data = if kind == Some("t3") {
-            &child["data"]
+            child["data"]
+                .as_object()
+                .ok_or_else(|| "Missing story data".to_string())?
         } else {
             return Err(format!("Unknown story type: {:?}", kind));
         };
 
-        let id = self.require_string(data, "id")?;
-        let subreddit = self.require_string(data, "subreddit")?.to_ascii_lowercase();
-        if let Some(true) = data["stickied"].as_bool() {
+        let id = self.require_str(data, "id")?;
+        let subreddit = self.require_str(data, "subreddit")?.to_ascii_lowercase();
+        if let Some(true) = data.get("stickied").and_then(Value::as_bool) {
             return Err(format!("Ignoring stickied story {}/{}", subreddit, id));
         }
-        let position = *positions
-            .entry(subreddit.clone())
-            .and_modify(|n| *n += 1)
-            .or_default()
-            + 1;
+        let position = if let Some(n) = positions.get_mut(&subreddit) {
+            *n += 1;
+            *n
+        } else {
+            positions.insert(subreddit.clone(), 1);
+            1
+        };
         let seconds: i64 = self.require_integer(data, "created_utc")?;
         let millis = seconds * 1000;
         let date = StoryDate::from_millis(millis).ok_or_else(|| "Unmappable date".to_string())?;
-        let url = StoryUrl::parse(unescape_entities(&self.require_string(data, "url")?))
+        let url = StoryUrl::parse(unescape_entities(self.require_str(data, "url")?))
             .ok_or_else(|| "Unmappable URL".to_string())?;
-        let raw_title = unescape_entities(&self.require_string(data, "title")?);
+        let raw_title = unescape_entities(self.require_str(data, "title")?);
         let num_comments = self.require_integer(data, "num_comments")?;
         let score = self.require_integer(data, "score")?;
         let downvotes = self.require_integer(data, "downs")?;
         let upvotes = self.require_integer(data, "ups")?;
         let upvote_ratio = self.require_float(data, "upvote_ratio")? as f32;
-        let flair = unescape_entities(&self.optional_string(data, "link_flair_text")?);
+        let flair = unescape_entities(self.optional_str(data, "link_flair_text"));
         let story = RedditStory::new_subsource(
-            id,
+            id.to_owned(),
             subreddit,
             date,
             raw_title,
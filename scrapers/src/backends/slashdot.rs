@@ -5,7 +5,6 @@ use std::{
 };
 
 use chrono::{DateTime, TimeZone, Utc};
-use itertools::Itertools;
 use serde::{Deserialize, Serialize};
 use tl::{HTMLTag, Parser, ParserOptions};
 use url::Url;
@@ -17,6 +16,25 @@ use super::{
     ScrapeSource, ScrapeSourceDef, ScrapeStory, Scraper,
 };
 
+/// Date patterns attempted in order: an optional day of week, a zero- or space-padded day, and
+/// an upper- or lower-case AM/PM.
+///
+/// https://docs.rs/chrono/latest/chrono/format/strftime/index.html
+const DATE_PATTERNS: [&str; 8] = [
+    "%A %B %d %Y %I:%M%p %z",
+    "%A %B %d %Y %I:%M%P %z",
+    "%A %B %e %Y %I:%M%p %z",
+    "%A %B %e %Y %I:%M%P %z",
+    "%B %d %Y %I:%M%p %z",
+    "%B %d %Y %I:%M%P %z",
+    "%B %e %Y %I:%M%p %z",
+    "%B %e %Y %I:%M%P %z",
+];
+
+lazy_static::lazy_static! {
+    static ref BASE_URL: Url = Url::parse("https://slashdot.org").expect("Failed to parse base URL");
+}
+
 pub struct Slashdot {}
 
 impl ScrapeSourceDef for Slashdot {
@@ -90,19 +108,9 @@ impl SlashdotScraper {
 
         // Expected at point: 'Monday January 09 2023 08:25PM -0500'
 
-        // https://docs.rs/chrono/latest/chrono/format/strftime/index.html
-        let day_of_week = ["%A ", ""];
-        let day = ["%d", "%e"];
-        let am_pm = ["%p", "%P"];
-
         // Attempt to use multiple patterns to parse
-        for ((day_of_week, day), am_pm) in day_of_week
-            .iter()
-            .cartesian_product(day)
-            .cartesian_product(am_pm)
-        {
-            let pattern = format!("{}%B {} %Y %I:%M{} %z", day_of_week, day, am_pm);
-            if let Some(date) = StoryDate::from_string(&date, &pattern) {
+        for pattern in DATE_PATTERNS {
+            if let Some(date) = StoryDate::from_string(&date, pattern) {
                 return Ok(date);
             }
         }
@@ -111,8 +119,7 @@ impl SlashdotScraper {
     }
 
     fn parse_topic(href: &str) -> Option<String> {
-        let base = Url::parse("https://slashdot.org").expect("Failed to parse base URL");
-        let url = base.join(href);
+        let url = BASE_URL.join(href);
         if let Ok(url) = url {
             if let Some((_, value)) = url.query_pairs().find(|(k, _)| k == "fhfilter") {
                 return Some(value.into());
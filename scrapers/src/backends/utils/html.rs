@@ -41,52 +41,43 @@ pub fn unescape_entities(input: &str) -> String {
         ("squot", "'"),
         ("nbsp", "\u{00a0}"),
     ];
-    let mut s = String::new();
-    let mut entity = false;
-    let mut entity_name = String::new();
-    'char: for c in input.chars() {
-        if entity {
-            if c == ';' {
-                entity = false;
-                if entity_name.starts_with("#x") {
-                    if let Ok(n) = u32::from_str_radix(&entity_name[2..entity_name.len()], 16) {
-                        if let Some(c) = char::from_u32(n) {
-                            s.push(c);
-                            entity_name.clear();
-                            continue 'char;
-                        }
-                    }
-                } else if entity_name.starts_with('#') {
-                    if let Ok(n) = u32::from_str_radix(&entity_name[1..entity_name.len()], 10) {
-                        if let Some(c) = char::from_u32(n) {
-                            s.push(c);
-                            entity_name.clear();
-                            continue 'char;
-                        }
-                    }
-                } else {
-                    for (name, value) in ENTITIES {
-                        if entity_name == name {
-                            s += value;
-                            entity_name.clear();
-                            continue 'char;
-                        }
-                    }
-                }
-                s += &format!("&{};", entity_name);
-                entity_name.clear();
-                continue 'char;
+    // Most strings contain no entities at all
+    if !input.contains('&') {
+        return input.to_owned();
+    }
+    let mut s = String::with_capacity(input.len());
+    let mut rest = input;
+    // Copy the runs of text between entities in bulk, rather than one char at a time
+    while let Some(start) = rest.find('&') {
+        s += &rest[..start];
+        rest = &rest[start + 1..];
+        let end = match rest.find(';') {
+            Some(end) => end,
+            None => {
+                s.push('&');
+                break;
             }
-            entity_name.push(c);
-        } else if c == '&' {
-            entity = true;
+        };
+        let entity_name = &rest[..end];
+        rest = &rest[end + 1..];
+        let decoded = if let Some(hex) = entity_name.strip_prefix("#x") {
+            u32::from_str_radix(hex, 16).ok().and_then(char::from_u32)
+        } else if let Some(dec) = entity_name.strip_prefix('#') {
+            u32::from_str_radix(dec, 10).ok().and_then(char::from_u32)
         } else {
+            None
+        };
+        if let Some(c) = decoded {
             s.push(c);
+        } else if let Some((_, value)) = ENTITIES.iter().find(|(name, _)| *name == entity_name) {
+            s += value;
+        } else {
+            s.push('&');
+            s += entity_name;
+            s.push(';');
         }
     }
-    if !entity_name.is_empty() {
-        s += &format!("&{}", entity_name);
-    }
+    s += rest;
     s
 }
 
@@ -101,6 +92,7 @@ mod test {
     #[case("a&#x27;b", "a'b")]
     #[case("a&#160;b", "a\u{00a0}b")]
     #[case("a&squot;&quot;b", "a'\"b")]
+    #[case("&lt;a&gt; &amp; &#x27;b&#x27;", "<a> & 'b'")]
     fn test_unescape(#[case] a: &str, #[case] b: &str) {
         assert_eq!(unescape_entities(a), b.to_owned());
     }
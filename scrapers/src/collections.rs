@@ -1,9 +1,5 @@
-use std::{
-    borrow::Cow,
-    collections::{hash_map::Entry, HashMap, HashSet},
-};
+use std::collections::{hash_map::Entry, HashMap};
 
-use itertools::Itertools;
 use serde::{Deserialize, Serialize};
 
 use crate::{
@@ -81,24 +77,19 @@ impl ScrapeCollection {
             }
         };
 
-        let iter = self
-            .scrapes
-            .iter()
-            .map(|(k, v)| (k, (extractor.extract(v), v)));
-        let scrapes = HashMap::from_iter(iter);
-        let mut title_story = *scrapes
-            .iter()
-            .next()
-            .expect("Expected at least one scrape")
-            .0;
+        // Extract each scrape and pick the title story in the same pass
+        let mut scrapes = HashMap::with_capacity(self.scrapes.len());
+        let mut title_story = None;
         let mut max_title_score = i32::MAX;
-        for (id, (_, _)) in &scrapes {
+        for (id, scrape) in &self.scrapes {
             let this_score = title_score(&id.source);
             if this_score < max_title_score {
                 max_title_score = this_score;
-                title_story = *id;
+                title_story = Some(id);
             }
+            scrapes.insert(id, (extractor.extract(scrape), scrape));
         }
+        let title_story = title_story.expect("Expected at least one scrape");
 
         ExtractedScrapeCollection {
             earliest: self.earliest,
@@ -135,12 +126,12 @@ impl<'a> ExtractedScrapeCollection<'a> {
             .url
     }
 
-    pub fn tags<'b>(&'b self) -> Vec<Cow<'a, str>> {
-        let mut tags = HashSet::new();
-        for (scrape, _) in self.scrapes.values() {
-            tags.extend(&scrape.tags);
-        }
-        tags.into_iter().cloned().collect_vec()
+    /// Iterates over the tags of every scrape. Tags shared between scrapes are yielded once per scrape, so callers
+    /// should accumulate them into a set.
+    pub fn tags<'b>(&'b self) -> impl Iterator<Item = &'b str> + 'b {
+        self.scrapes
+            .values()
+            .flat_map(|(scrape, _)| scrape.tags.iter().map(|tag| tag.as_ref()))
     }
     // /// Choose a title based on source priority, with preference for shorter titles if the priority is the same.
     // fn title_choice(&self) -> (ScrapeSource, Cow<str>) {
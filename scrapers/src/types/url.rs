@@ -1,8 +1,4 @@
-use std::{
-    collections::hash_map::DefaultHasher,
-    fmt::Display,
-    hash::{Hash, Hasher},
-};
+use std::fmt::Display;
 
 use serde::{Deserialize, Serialize};
 use url::Url;
@@ -127,14 +123,91 @@ impl StoryUrlNorm {
         Self { norm }
     }
 
+    /// A hash of the normalized URL that is stored in the index, so it must never change.
     pub fn hash(&self) -> i64 {
-        let mut hasher = DefaultHasher::new();
-        self.norm.hash(&mut hasher);
-
-        hasher.finish() as i64
+        stable_hash(&self.norm) as i64
     }
 
     pub fn string(&self) -> &str {
         &self.norm
     }
 }
+
+/// SipHash-1-3 with zero keys over the string's bytes followed by a `0xff` terminator. This is bit-for-bit what
+/// `DefaultHasher::new()` and `str::hash` produced when the index was created, but unlike `DefaultHasher` it is
+/// guaranteed not to change between Rust releases.
+fn stable_hash(s: &str) -> u64 {
+    #[inline(always)]
+    fn sip_round(v: &mut [u64; 4]) {
+        v[0] = v[0].wrapping_add(v[1]);
+        v[1] = v[1].rotate_left(13);
+        v[1] ^= v[0];
+        v[0] = v[0].rotate_left(32);
+        v[2] = v[2].wrapping_add(v[3]);
+        v[3] = v[3].rotate_left(16);
+        v[3] ^= v[2];
+        v[0] = v[0].wrapping_add(v[3]);
+        v[3] = v[3].rotate_left(21);
+        v[3] ^= v[0];
+        v[2] = v[2].wrapping_add(v[1]);
+        v[1] = v[1].rotate_left(17);
+        v[1] ^= v[2];
+        v[2] = v[2].rotate_left(32);
+    }
+
+    let mut v: [u64; 4] = [
+        0x736f6d6570736575,
+        0x646f72616e646f6d,
+        0x6c7967656e657261,
+        0x7465646279746573,
+    ];
+    let bytes = s.as_bytes();
+    // Includes the terminator byte
+    let len = bytes.len() + 1;
+
+    let mut chunks = bytes.chunks_exact(8);
+    for chunk in &mut chunks {
+        let m = u64::from_le_bytes(chunk.try_into().expect("Chunk must be 8 bytes"));
+        v[3] ^= m;
+        sip_round(&mut v);
+        v[0] ^= m;
+    }
+
+    // The remaining bytes plus the terminator may fill exactly one more block
+    let rest = chunks.remainder();
+    let mut tail = [0_u8; 8];
+    tail[..rest.len()].copy_from_slice(rest);
+    tail[rest.len()] = 0xff;
+    let mut m = u64::from_le_bytes(tail);
+    if rest.len() == 7 {
+        v[3] ^= m;
+        sip_round(&mut v);
+        v[0] ^= m;
+        m = 0;
+    }
+
+    let b = m | ((len as u64 & 0xff) << 56);
+    v[3] ^= b;
+    sip_round(&mut v);
+    v[0] ^= b;
+    v[2] ^= 0xff;
+    sip_round(&mut v);
+    sip_round(&mut v);
+    sip_round(&mut v);
+    v[0] ^ v[1] ^ v[2] ^ v[3]
+}
+
+#[cfg(test)]
+mod test {
+    use super::*;
+    use rstest::*;
+
+    /// These values are persisted in the index, so they must never change.
+    #[rstest]
+    #[case("", 3476900567878811119)]
+    #[case("com.example", -3385701993427709007)]
+    #[case("com.ycombinator.news:item?id=1", 7137097581397250323)]
+    fn test_stable_hash(#[case] norm: &str, #[case] hash: i64) {
+        assert_eq!(StoryUrlNorm::from_string(norm.to_owned()).hash(), hash);
+    }
+}
@@ -1,6 +1,7 @@
 use num_format::ToFormattedString;
 use progscrape_scrapers::{ScrapeId, StoryDate, StoryDuration};
 use serde_json::Value;
+use std::collections::HashMap;
 
 use super::static_files::StaticFileRegistry;
 
@@ -95,6 +96,7 @@ impl tera::Filter for RelativeTimeFilter {
     }
 }
 
+/// Approximate time relative to the `now` argument, or the current time if it isn't passed.
 #[derive(Default)]
 pub struct ApproxTimeFilter {}
 
@@ -102,10 +104,14 @@ impl tera::Filter for ApproxTimeFilter {
     fn filter(
         &self,
         value: &Value,
-        _args: &std::collections::HashMap<String, Value>,
+        args: &std::collections::HashMap<String, Value>,
     ) -> tera::Result<Value> {
         let date = value.as_i64().and_then(StoryDate::from_seconds);
-        let now = StoryDate::now();
+        let now = args
+            .get("now")
+            .and_then(Value::as_i64)
+            .and_then(StoryDate::from_seconds)
+            .unwrap_or_else(StoryDate::now);
 
         if let Some(date) = date {
             Ok(if now > date {
@@ -167,33 +173,34 @@ impl tera::Filter for CommentLinkFilter {
     }
 }
 
+/// Maps static file keys to their hashed URLs, which are formatted once up-front since this filter runs for
+/// every source icon of every story rendered.
 pub struct StaticFileFilter {
-    static_files: StaticFileRegistry,
+    urls: HashMap<String, Value>,
 }
 
 impl StaticFileFilter {
     pub fn new(static_files: StaticFileRegistry) -> Self {
-        Self { static_files }
+        let urls = static_files
+            .keys()
+            .filter_map(|key| {
+                let url = format!("/static/{}", static_files.lookup_key(&key)?);
+                Some((key, url.into()))
+            })
+            .collect();
+        Self { urls }
     }
 }
 
 impl tera::Filter for StaticFileFilter {
-    fn filter(
-        &self,
-        value: &Value,
-        _args: &std::collections::HashMap<String, Value>,
-    ) -> tera::Result<Value> {
+    fn filter(&self, value: &Value, _args: &HashMap<String, Value>) -> tera::Result<Value> {
         let key = value.as_str().unwrap_or_else(|| {
             tracing::warn!("Invalid input to static filter");
             ""
         });
-        let s = format!(
-            "/static/{}",
-            self.static_files.lookup_key(key).unwrap_or_else(|| {
-                tracing::warn!("Static file not found: {}", key);
-                "<invalid>"
-            })
-        );
-        Ok(s.into())
+        Ok(self.urls.get(key).cloned().unwrap_or_else(|| {
+            tracing::warn!("Static file not found: {}", key);
+            "/static/<invalid>".into()
+        }))
     }
 }
@@ -1,7 +1,12 @@
 use std::{
     collections::{HashMap, HashSet},
+    future::Future,
     path::Path,
-    time::Instant,
+    sync::{
+        atomic::{AtomicUsize, Ordering},
+        Arc,
+    },
+    time::{Duration, Instant},
 };
 
 use crate::{
@@ -21,13 +26,19 @@ use tracing::Level;
 
 pub struct HotSet {
     stories: Vec<Story<Shard>>,
+    /// Host-independent renders of `stories`, computed once per refresh rather than per request.
+    renders: Vec<StoryRender>,
     top_tags: Vec<(String, usize)>,
+    /// Fully-serialized front page responses, dropped along with the rest of the hot set on refresh.
+    responses: SharedMut<HashMap<String, String>>,
 }
 
 #[derive(Serialize, Deserialize, Default, Clone)]
 pub struct IndexConfig {
     pub hot_set: HotSetConfig,
     pub max_count: usize,
+    #[serde(default)]
+    pub search_cache: SearchCacheConfig,
 }
 
 #[derive(Serialize, Deserialize, Default, Clone)]
@@ -38,10 +49,289 @@ pub struct HotSetConfig {
     pub jitter: f32,
 }
 
+#[derive(Serialize, Deserialize, Clone)]
+#[serde(default)]
+pub struct SearchCacheConfig {
+    /// How long (in seconds) we cache a search that returned results
+    pub ttl: u64,
+    /// How long (in seconds) we cache a search that returned nothing
+    pub empty_ttl: u64,
+    /// How long (in seconds) we cache a search that has been hit frequently
+    pub popular_ttl: u64,
+    /// The number of cache hits after which a search is considered popular
+    pub popular_hits: usize,
+    /// The maximum number of searches we keep cached
+    pub max_entries: usize,
+    /// The maximum number of stories we keep cached, across all searches
+    pub max_stories: usize,
+}
+
+impl Default for SearchCacheConfig {
+    fn default() -> Self {
+        Self {
+            ttl: 60 * 60,
+            empty_ttl: 60,
+            popular_ttl: 6 * 60 * 60,
+            popular_hits: 10,
+            max_entries: 1000,
+            max_stories: 20000,
+        }
+    }
+}
+
+/// The number of stories fetched (and cached) for a search.
+const SEARCH_FETCH_COUNT: usize = 100;
+
+struct SearchCacheEntry {
+    query: StoryQuery,
+    /// Shared so that cache hits don't copy the stories.
+    stories: Arc<[Story<Shard>]>,
+    created: Instant,
+    /// Set when the index has changed since the search was run.
+    stale: bool,
+    /// Atomic so that cache hits only need a read lock on the cache.
+    hits: AtomicUsize,
+}
+
+impl SearchCacheEntry {
+    /// Empty results expire quickly, while popular searches live longer.
+    fn ttl(&self, config: &SearchCacheConfig) -> Duration {
+        let ttl = if self.stories.is_empty() {
+            config.empty_ttl
+        } else if self.hits.load(Ordering::Relaxed) > config.popular_hits {
+            config.popular_ttl
+        } else {
+            config.ttl
+        };
+        Duration::from_secs(ttl)
+    }
+
+    fn is_expired(&self, config: &SearchCacheConfig) -> bool {
+        self.stale || self.created.elapsed() > self.ttl(config)
+    }
+}
+
+/// Caches the results of non-front-page searches, including searches that returned nothing.
+#[derive(Default)]
+struct SearchCache {
+    entries: HashMap<String, SearchCacheEntry>,
+    /// The number of stories held across all entries.
+    story_count: usize,
+    /// Bumped every time the cache is invalidated, so that searches which were running at the time don't cache
+    /// their now-outdated results as fresh.
+    generation: u64,
+}
+
+impl SearchCache {
+    /// Returns a search's cached results, counting the hit towards the search's popularity.
+    fn get(&self, config: &SearchCacheConfig, key: &str) -> Option<Arc<[Story<Shard>]>> {
+        let entry = self.fresh_entry(config, key)?;
+        entry.hits.fetch_add(1, Ordering::Relaxed);
+        Some(entry.stories.clone())
+    }
+
+    /// Like `get`, but without counting a hit.
+    fn peek(&self, config: &SearchCacheConfig, key: &str) -> Option<Arc<[Story<Shard>]>> {
+        self.fresh_entry(config, key)
+            .map(|entry| entry.stories.clone())
+    }
+
+    fn fresh_entry(&self, config: &SearchCacheConfig, key: &str) -> Option<&SearchCacheEntry> {
+        self.entries
+            .get(key)
+            .filter(|entry| !entry.is_expired(config))
+    }
+
+    /// Cache the results of a search that was started at `generation`. If the cache has been invalidated since,
+    /// the results are kept (along with the search's hit count) but are already stale.
+    fn insert(
+        &mut self,
+        config: &SearchCacheConfig,
+        generation: u64,
+        key: String,
+        query: StoryQuery,
+        stories: Arc<[Story<Shard>]>,
+    ) {
+        // Hit counts survive a refresh so popular searches keep their longer TTL
+        let hits = self.entries.remove(&key).map_or(0, |entry| {
+            self.story_count -= entry.stories.len();
+            entry.hits.into_inner()
+        });
+        let is_full = |cache: &Self| {
+            cache.entries.len() >= config.max_entries
+                || cache.story_count + stories.len() > config.max_stories
+        };
+        if is_full(self) {
+            // Evict expired entries first, then the least-hit and oldest. Popular searches go last, since their hit
+            // counts decide what gets warmed.
+            let mut evictable = self
+                .entries
+                .iter()
+                .map(|(key, entry)| {
+                    let hits = entry.hits.load(Ordering::Relaxed);
+                    let rank = (
+                        hits > config.popular_hits,
+                        !entry.is_expired(config),
+                        hits,
+                        entry.created,
+                    );
+                    (rank, key.clone())
+                })
+                .collect_vec();
+            evictable.sort_unstable();
+            for (_, key) in evictable {
+                if !is_full(self) {
+                    break;
+                }
+                if let Some(entry) = self.entries.remove(&key) {
+                    self.story_count -= entry.stories.len();
+                }
+            }
+        }
+        self.story_count += stories.len();
+        self.entries.insert(
+            key,
+            SearchCacheEntry {
+                query,
+                stories,
+                created: Instant::now(),
+                stale: generation != self.generation,
+                hits: AtomicUsize::new(hits),
+            },
+        );
+    }
+
+    /// Marks every entry as stale after the index changes. Entries keep their hit counts, so popular searches can
+    /// be warmed again.
+    fn invalidate(&mut self) {
+        self.generation += 1;
+        for entry in self.entries.values_mut() {
+            entry.stale = true;
+        }
+    }
+
+    /// Popular searches whose entries have expired, and are worth re-running before they are next requested.
+    fn popular_expired(&self, config: &SearchCacheConfig) -> Vec<(String, StoryQuery)> {
+        self.entries
+            .iter()
+            .filter(|(_, entry)| {
+                entry.hits.load(Ordering::Relaxed) > config.popular_hits && entry.is_expired(config)
+            })
+            .map(|(key, entry)| (key.clone(), entry.query.clone()))
+            .collect()
+    }
+
+    /// Replace a warmed entry's results. The hit count restarts so that a search only stays warm while it
+    /// stays popular.
+    fn warm(
+        &mut self,
+        config: &SearchCacheConfig,
+        generation: u64,
+        key: String,
+        query: StoryQuery,
+        stories: Arc<[Story<Shard>]>,
+    ) {
+        self.insert(config, generation, key.clone(), query, stories);
+        if let Some(entry) = self.entries.get(&key) {
+            entry.hits.store(0, Ordering::Relaxed);
+        }
+    }
+}
+
+/// A search that missed the cache and is currently being run.
+struct SearchFlight {
+    lock: Arc<tokio::sync::Mutex<()>>,
+    /// The number of requests running or waiting on this search.
+    requests: usize,
+}
+
+/// Searches that missed the cache and are currently being run, so that identical misses wait for the first one
+/// rather than all running the same query.
+#[derive(Clone)]
+struct SearchFlights {
+    flights: SharedMut<HashMap<String, SearchFlight>>,
+}
+
+/// A request's place in a [`SearchFlight`]. The flight is retired once every request in it has finished or been
+/// dropped.
+struct SearchFlightGuard<'a> {
+    flights: &'a SearchFlights,
+    key: String,
+    lock: Arc<tokio::sync::Mutex<()>>,
+}
+
+impl Drop for SearchFlightGuard<'_> {
+    fn drop(&mut self) {
+        let mut flights = self.flights.flights.write();
+        if let Some(flight) = flights.get_mut(&self.key) {
+            flight.requests -= 1;
+            if flight.requests == 0 {
+                flights.remove(&self.key);
+            }
+        }
+    }
+}
+
+impl SearchFlights {
+    fn new() -> Self {
+        Self {
+            flights: SharedMut::new(HashMap::new()),
+        }
+    }
+
+    fn join(&self, key: &str) -> SearchFlightGuard {
+        let mut flights = self.flights.write();
+        let flight = flights
+            .entry(key.to_owned())
+            .or_insert_with(|| SearchFlight {
+                lock: Arc::default(),
+                requests: 0,
+            });
+        flight.requests += 1;
+        SearchFlightGuard {
+            flights: self,
+            key: key.to_owned(),
+            lock: flight.lock.clone(),
+        }
+    }
+
+    /// Runs `fetch` for a search that missed the cache, and caches its results. Identical searches that miss while
+    /// it is running wait for it to finish and then take its results from the cache, so a burst of cold searches
+    /// only hits storage once. If it fails, the next waiting search runs it instead.
+    async fn run<F: Future<Output = Result<Vec<Story<Shard>>, PersistError>>>(
+        &self,
+        cache: &SharedMut<SearchCache>,
+        config: &SearchCacheConfig,
+        key: &str,
+        query: StoryQuery,
+        fetch: impl FnOnce(StoryQuery) -> F,
+    ) -> Result<Arc<[Story<Shard>]>, PersistError> {
+        let flight = self.join(key);
+        let _lock = flight.lock.lock().await;
+
+        // Another request may have run this search while we were waiting. Peek, since waiting isn't a cache hit.
+        let (cached, generation) = {
+            let cache = cache.read();
+            (cache.peek(config, key), cache.generation)
+        };
+        if let Some(stories) = cached {
+            return Ok(stories);
+        }
+
+        let stories: Arc<[_]> = fetch(query.clone()).await?.into();
+        cache
+            .write()
+            .insert(config, generation, key.to_owned(), query, stories.clone());
+        Ok(stories)
+    }
+}
+
 pub struct Index<S: StorageWriter> {
     pub pinned_story: SharedMut<Option<StoryUrl>>,
     storage: SharedMut<S>,
     hot_set: SharedMut<HotSet>,
+    search_cache: SharedMut<SearchCache>,
+    search_flights: SearchFlights,
     eval: Shared<StoryEvaluator>,
     blog: Shared<Vec<BlogPost>>,
     config: Shared<IndexConfig>,
@@ -52,6 +342,8 @@ impl<S: StorageWriter> Clone for Index<S> {
         Self {
             storage: self.storage.clone(),
             hot_set: self.hot_set.clone(),
+            search_cache: self.search_cache.clone(),
+            search_flights: self.search_flights.clone(),
             pinned_story: self.pinned_story.clone(),
             eval: self.eval.clone(),
             blog: self.blog.clone(),
@@ -98,8 +390,12 @@ impl Index<StoryIndex> {
             storage: SharedMut::new(index),
             hot_set: SharedMut::new(HotSet {
                 stories: vec![],
+                renders: vec![],
                 top_tags: vec![],
+                responses: SharedMut::new(HashMap::new()),
             }),
+            search_cache: SharedMut::new(SearchCache::default()),
+            search_flights: SearchFlights::new(),
             pinned_story: SharedMut::new(None),
             blog,
             eval,
@@ -108,19 +404,19 @@ impl Index<StoryIndex> {
     }
 
     fn compute_hot_set(&self, stories: Vec<Story<Shard>>, now: StoryDate) -> HotSet {
-        // First we'll sort these stories
-        let scorer = &self.eval.read().scorer;
+        // First we'll separate out the pinned story
+        let eval = self.eval.read();
+        let scorer = &eval.scorer;
         let lock = self.pinned_story.read();
         let pinned = (*lock).as_ref();
         let (mut pinned, mut stories) = stories
             .into_iter()
             .partition::<Vec<Story<Shard>>, _>(|s| Some(&s.url) == pinned);
         pinned.truncate(1);
-        stories
-            .sort_by_cached_key(|x| ((x.score + scorer.score_age(now - x.date)) * -1000.0) as i32);
 
-        // Count each item
-        let mut tag_counts = HashMap::new();
+        // Count each item. This happens before the sort and borrows the tags from the stories, so we only
+        // allocate strings for the handful of tags that make the cut.
+        let mut tag_counts: HashMap<&str, usize> = HashMap::new();
         for story in &stories {
             // We won't count tags from any self posts because these tend to dominate the trending tags in two
             // way: first, by spamming the source's domain, and second in cases like Python/Rust where there are
@@ -128,26 +424,38 @@ impl Index<StoryIndex> {
             if story.is_likely_self_post() {
                 continue;
             }
-            for tag in story.raw_tags() {
-                tag_counts
-                    .entry(tag)
-                    .and_modify(|x| *x += 1)
-                    .or_insert(1_usize);
+            let tags =
+                std::iter::once(story.url.host()).chain(story.tags.iter().map(String::as_str));
+            for tag in tags {
+                *tag_counts.entry(tag).or_default() += 1;
             }
         }
 
-        // Naive sort and truncate (fine for the number of tags we're dealing with)
+        // Naive sort and truncate (fine for the number of tags we're dealing with), then convert to display
+        // tags once here rather than on every request.
+        let tagger = &eval.tagger;
         let top_tags = tag_counts
             .into_iter()
             .filter(|(_, count)| *count > 1)
             .sorted_by_cached_key(|(_, count)| -((*count) as i64))
             .take(50)
+            .map(|(s, count)| (tagger.make_display_tag(s), count))
             .collect_vec();
 
+        stories
+            .sort_by_cached_key(|x| ((x.score + scorer.score_age(now - x.date)) * -1000.0) as i32);
+
         pinned.append(&mut stories);
+        let renders = pinned
+            .iter()
+            .enumerate()
+            .map(|(order, story)| story.render(&eval, order))
+            .collect_vec();
         HotSet {
             stories: pinned,
+            renders,
             top_tags,
+            responses: SharedMut::new(HashMap::new()),
         }
     }
 
@@ -186,9 +494,35 @@ impl Index<StoryIndex> {
         //     v.append(&mut self.fetch(StoryQuery::UrlSearch(pinned.clone()), 1).await?);
         // }
         *self.hot_set.write() = self.compute_hot_set(v, now);
+
+        self.warm_search_cache().await;
         Ok(())
     }
 
+    /// Re-run popular searches that have expired from the search cache, or were invalidated by newly-inserted
+    /// stories, so the next request for them is served from the cache rather than the index. A search that fails to
+    /// warm is logged and left expired, and doesn't fail the refresh.
+    async fn warm_search_cache(&self) {
+        let cache_config = self.config.read().search_cache.clone();
+        let (expired, generation) = {
+            let cache = self.search_cache.read();
+            (cache.popular_expired(&cache_config), cache.generation)
+        };
+        for (key, query) in expired {
+            let stories = match self.fetch::<Shard>(query.clone(), SEARCH_FETCH_COUNT).await {
+                Ok(stories) => stories,
+                Err(e) => {
+                    tracing::error!("Failed to warm search cache for query={}: {:?}", key, e);
+                    continue;
+                }
+            };
+            tracing::info!("Warmed search cache for query={}", key);
+            self.search_cache
+                .write()
+                .warm(&cache_config, generation, key, query, stories.into());
+        }
+    }
+
     /// Borrows the hot set
     fn with_hot_set<T>(
         &self,
@@ -210,8 +544,11 @@ impl Index<StoryIndex> {
             storage.reinsert_stories(&eval_clone.read(), story_ids)
         })?;
 
-        // Refresh the hot set from the index
-        self.refresh_hot_set().await?;
+        // Refresh the hot set from the index, but only if we actually rewrote anything
+        if res.contains(&ScrapePersistResult::MergedWithExistingStory) {
+            self.search_cache.write().invalidate();
+            self.refresh_hot_set().await?;
+        }
 
         Ok(res)
     }
@@ -232,24 +569,63 @@ impl Index<StoryIndex> {
             .collect_vec()
     }
 
+    /// Renders the hot set from its cached renders, only re-numbering the requested page.
+    fn render_hot_set<S: From<StoryRender>>(
+        &self,
+        host: &HostParams,
+        offset: usize,
+        count: usize,
+    ) -> Vec<S> {
+        let hot_set = self.hot_set.read();
+        hot_set
+            .stories
+            .iter()
+            .zip(&hot_set.renders)
+            .skip(offset)
+            .take(count)
+            .enumerate()
+            .map(|(index, (story, render))| {
+                let render = StoryRender {
+                    order: index,
+                    ..render.clone()
+                };
+                self.finish_render(host, story, render).map(|s| s.into())
+            })
+            .filter_map(|story| story)
+            .collect_vec()
+    }
+
     fn render<'a>(
         &self,
         host: &HostParams,
         story: &'a Story<Shard>,
         order: usize,
     ) -> Option<StoryRender> {
-        let mut render = story.render(&self.eval.read(), order);
+        let render = story.render(&self.eval.read(), order);
+        self.finish_render(host, story, render)
+    }
+
+    /// Applies the host-specific parts of a render, returning `None` if the story should not be displayed.
+    fn finish_render(
+        &self,
+        host: &HostParams,
+        story: &Story<Shard>,
+        mut render: StoryRender,
+    ) -> Option<StoryRender> {
         // TODO: This is a bit hacky
         if story.url.host() == "progscrape.com" {
             for blog in &*self.blog.read() {
                 if blog.url == story.url {
                     render.html = blog.html.clone();
-                    // Not efficient, but this is pretty rare
-                    for tag in &blog.tags {
-                        if !render.tags.contains(tag) {
-                            render.tags.push(tag.to_owned());
-                        }
-                    }
+                    let existing: HashSet<&str> = render.tags.iter().map(String::as_str).collect();
+                    let missing = blog
+                        .tags
+                        .iter()
+                        .filter(|tag| !existing.contains(tag.as_str()))
+                        .unique()
+                        .cloned()
+                        .collect_vec();
+                    render.tags.extend(missing);
                     // TODO: Would be nice if StoryUrl preserved the URL parts
                     render.url = story.url.raw().replace(
                         "http://progscrape/",
@@ -287,38 +663,66 @@ impl Index<StoryIndex> {
         count: usize,
     ) -> Result<Vec<S>, PersistError> {
         let stories = if let StoryQuery::FrontPage = query {
-            self.filter_and_render(host, self.hot_set.read().stories.iter(), offset, count)
+            self.render_hot_set(host, offset, count)
         } else {
-            let start = Instant::now();
-            let (query_log, query_text) = if tracing::enabled!(Level::INFO) {
-                (
-                    Some(format!("{query:?}")),
-                    Some(format!("{:?}", query.query_text().to_string())),
-                )
+            let cache_key = format!("{query:?}");
+            let cache_config = self.config.read().search_cache.clone();
+            let cached = self.search_cache.read().get(&cache_config, &cache_key);
+            let stories = if let Some(stories) = cached {
+                stories
             } else {
-                (None, None)
+                self.search_uncached(query, cache_key, &cache_config)
+                    .await?
             };
-            let stories = self.fetch::<Shard>(query, 100).await?;
-            let elapsed_ms = start.elapsed().as_millis();
-            tracing::info!(
-                "Search query_text={} search_time={elapsed_ms}ms query={}",
-                query_text.unwrap_or_default(),
-                query_log.unwrap_or_default()
-            );
             self.filter_and_render(host, stories.iter(), offset, count)
         };
 
         Ok(stories)
     }
 
+    /// Runs a search that missed the cache, unless an identical search is already running.
+    async fn search_uncached(
+        &self,
+        query: StoryQuery,
+        cache_key: String,
+        cache_config: &SearchCacheConfig,
+    ) -> Result<Arc<[Story<Shard>]>, PersistError> {
+        let cache_key = cache_key.as_str();
+        self.search_flights
+            .run(
+                &self.search_cache,
+                cache_config,
+                cache_key,
+                query,
+                |query| async move {
+                    let start = Instant::now();
+                    let query_text = if tracing::enabled!(Level::INFO) {
+                        Some(format!("{:?}", query.query_text().to_string()))
+                    } else {
+                        None
+                    };
+                    let stories = self.fetch::<Shard>(query, SEARCH_FETCH_COUNT).await?;
+                    let elapsed_ms = start.elapsed().as_millis();
+                    tracing::info!(
+                        "Search query_text={} search_time={elapsed_ms}ms query={}",
+                        query_text.unwrap_or_default(),
+                        cache_key
+                    );
+                    Ok(stories)
+                },
+            )
+            .await
+    }
+
+    /// Returns the serialized front page response cache for the current hot set. Take this before rendering so a
+    /// response can never outlive the hot set it was rendered from.
+    pub fn front_page_responses(&self) -> SharedMut<HashMap<String, String>> {
+        self.hot_set.read().responses.clone()
+    }
+
     pub fn top_tags(&self, limit: usize) -> Result<Vec<(String, usize)>, PersistError> {
         let top_tags = &self.hot_set.read().top_tags;
-        let tagger = &self.eval.read().tagger;
-        Ok(top_tags
-            .iter()
-            .take(limit)
-            .map(|(s, count)| (tagger.make_display_tag(s), *count))
-            .collect_vec())
+        Ok(top_tags.iter().take(limit).cloned().collect_vec())
     }
 
     pub async fn insert_scrapes<I: IntoIterator<Item = TypedScrape> + Send + 'static>(
@@ -326,9 +730,18 @@ impl Index<StoryIndex> {
         scrapes: I,
     ) -> Result<Vec<ScrapePersistResult>, PersistError> {
         let eval = self.eval.clone();
-        async_run_write!(self.storage, move |storage: &mut StoryIndex| {
+        let res = async_run_write!(self.storage, move |storage: &mut StoryIndex| {
             storage.insert_scrapes(&eval.read(), scrapes)
-        })
+        })?;
+
+        // New and merged stories may belong in any cached search
+        if res
+            .iter()
+            .any(|res| *res != ScrapePersistResult::AlreadyPartOfExistingStory)
+        {
+            self.search_cache.write().invalidate();
+        }
+        Ok(res)
     }
 
     pub async fn most_recent_story(&self) -> Result<StoryDate, PersistError> {
@@ -379,3 +792,460 @@ impl Index<StoryIndex> {
         })
     }
 }
+
+#[cfg(test)]
+mod test {
+    use std::{
+        path::Path,
+        sync::atomic::{AtomicUsize, Ordering},
+        time::{Duration, Instant},
+    };
+
+    use keepcalm::{Shared, SharedMut};
+    use progscrape_application::{
+        PersistError, ScrapePersistResult, Shard, Story, StoryIndex, StoryQuery, StoryRender,
+    };
+    use progscrape_scrapers::{
+        hacker_news::HackerNewsStory, ScrapeId, StoryDate, StoryUrl, TypedScrape,
+    };
+
+    use super::{HotSetConfig, Index, IndexConfig, SearchCache, SearchCacheConfig, SearchFlights};
+    use crate::{resource::Resources, web::HostParams};
+
+    fn stories(count: usize) -> Vec<Story<Shard>> {
+        let url = StoryUrl::parse("http://example.com").expect("URL");
+        let date = StoryDate::year_month_day(2020, 1, 1).expect("Date failed");
+        (0..count)
+            .map(|i| {
+                Story::new_from_parts(
+                    format!("Story {i}"),
+                    url.clone(),
+                    date,
+                    0.0,
+                    Vec::<String>::new(),
+                    Vec::<(ScrapeId, Shard)>::new(),
+                )
+            })
+            .collect()
+    }
+
+    fn insert(cache: &mut SearchCache, config: &SearchCacheConfig, key: &str, count: usize) {
+        let query = StoryQuery::TextSearch(key.to_owned());
+        let generation = cache.generation;
+        cache.insert(
+            config,
+            generation,
+            key.to_owned(),
+            query,
+            stories(count).into(),
+        );
+    }
+
+    /// Pretend that an entry was created some number of seconds ago.
+    fn age(cache: &mut SearchCache, key: &str, secs: u64) {
+        let entry = cache.entries.get_mut(key).expect("Missing entry");
+        entry.created = Instant::now()
+            .checked_sub(Duration::from_secs(secs))
+            .expect("Clock too early");
+    }
+
+    fn hits(cache: &SearchCache, key: &str) -> usize {
+        cache.entries[key].hits.load(Ordering::Relaxed)
+    }
+
+    #[test]
+    fn test_search_cache_ttl() {
+        let config = SearchCacheConfig::default();
+        let mut cache = SearchCache::default();
+        insert(&mut cache, &config, "empty", 0);
+        insert(&mut cache, &config, "some", 10);
+
+        let ttl = |cache: &SearchCache, key: &str| cache.entries[key].ttl(&config).as_secs();
+        assert_eq!(ttl(&cache, "empty"), config.empty_ttl);
+        assert_eq!(ttl(&cache, "some"), config.ttl);
+
+        // Popular once it has been hit more than `popular_hits` times
+        for _ in 0..config.popular_hits {
+            cache.get(&config, "some").expect("Missing");
+        }
+        assert_eq!(ttl(&cache, "some"), config.ttl);
+        cache.get(&config, "some").expect("Missing");
+        assert_eq!(ttl(&cache, "some"), config.popular_ttl);
+    }
+
+    #[test]
+    fn test_search_cache_expiry() {
+        let config = SearchCacheConfig::default();
+        let mut cache = SearchCache::default();
+        insert(&mut cache, &config, "empty", 0);
+        insert(&mut cache, &config, "some", 10);
+
+        // Empty results expire well before anything else
+        age(&mut cache, "empty", config.empty_ttl + 1);
+        age(&mut cache, "some", config.empty_ttl + 1);
+        assert!(cache.get(&config, "empty").is_none());
+        assert_eq!(cache.get(&config, "some").expect("Missing").len(), 10);
+
+        age(&mut cache, "some", config.ttl + 1);
+        assert!(cache.get(&config, "some").is_none());
+    }
+
+    #[test]
+    fn test_search_cache_hits() {
+        let config = SearchCacheConfig::default();
+        let mut cache = SearchCache::default();
+        insert(&mut cache, &config, "some", 10);
+
+        cache.get(&config, "some").expect("Missing");
+        assert_eq!(hits(&cache, "some"), 1);
+
+        // Peeking doesn't count, and neither do misses on an expired entry
+        cache.peek(&config, "some").expect("Missing");
+        assert_eq!(hits(&cache, "some"), 1);
+        age(&mut cache, "some", config.ttl + 1);
+        assert!(cache.get(&config, "some").is_none());
+        assert_eq!(hits(&cache, "some"), 1);
+
+        // Hits survive the entry being refreshed
+        insert(&mut cache, &config, "some", 10);
+        assert_eq!(hits(&cache, "some"), 1);
+    }
+
+    #[test]
+    fn test_search_cache_eviction() {
+        let config = SearchCacheConfig {
+            max_entries: 2,
+            max_stories: 25,
+            ..Default::default()
+        };
+        let mut cache = SearchCache::default();
+
+        // Too many entries: the expired one goes first
+        insert(&mut cache, &config, "a", 1);
+        insert(&mut cache, &config, "b", 1);
+        age(&mut cache, "a", config.ttl + 1);
+        insert(&mut cache, &config, "c", 1);
+        assert!(!cache.entries.contains_key("a"));
+        assert!(cache.get(&config, "b").is_some());
+        assert!(cache.get(&config, "c").is_some());
+
+        // With nothing expired, the least-hit entry goes
+        cache.get(&config, "b").expect("Missing");
+        insert(&mut cache, &config, "d", 1);
+        assert!(!cache.entries.contains_key("c"));
+        assert!(cache.get(&config, "b").is_some());
+        assert!(cache.get(&config, "d").is_some());
+    }
+
+    /// A burst of distinct searches can't push a popular search (and its hit count) out of a full cache, even once
+    /// the popular search has expired.
+    #[test]
+    fn test_search_cache_eviction_popular() {
+        let config = SearchCacheConfig {
+            max_entries: 3,
+            ..Default::default()
+        };
+        let mut cache = SearchCache::default();
+        insert(&mut cache, &config, "popular", 10);
+        for _ in 0..=config.popular_hits {
+            cache.get(&config, "popular").expect("Missing");
+        }
+        cache.invalidate();
+
+        for i in 0..10 {
+            insert(&mut cache, &config, &format!("burst {i}"), 10);
+        }
+        assert_eq!(cache.entries.len(), 3);
+        assert_eq!(hits(&cache, "popular"), config.popular_hits + 1);
+        let expired = cache.popular_expired(&config);
+        assert_eq!(expired.len(), 1);
+        assert_eq!(expired[0].0, "popular");
+    }
+
+    #[test]
+    fn test_search_cache_story_limit() {
+        let config = SearchCacheConfig {
+            max_entries: 10,
+            max_stories: 25,
+            ..Default::default()
+        };
+        let mut cache = SearchCache::default();
+
+        // Too many stories, even though there's room for more entries
+        insert(&mut cache, &config, "a", 20);
+        insert(&mut cache, &config, "b", 5);
+        assert_eq!(cache.story_count, 25);
+        insert(&mut cache, &config, "c", 10);
+        assert!(!cache.entries.contains_key("a"));
+        assert_eq!(cache.story_count, 15);
+
+        // Replacing an entry doesn't count its old stories twice
+        insert(&mut cache, &config, "c", 20);
+        assert_eq!(cache.entries.len(), 2);
+        assert_eq!(cache.story_count, 25);
+    }
+
+    #[test]
+    fn test_search_cache_invalidate() {
+        let config = SearchCacheConfig::default();
+        let mut cache = SearchCache::default();
+        insert(&mut cache, &config, "some", 10);
+
+        cache.invalidate();
+        assert!(cache.get(&config, "some").is_none());
+
+        // Running the search again makes it fresh
+        insert(&mut cache, &config, "some", 10);
+        assert!(cache.get(&config, "some").is_some());
+
+        // But not if the cache was invalidated while the search was running
+        let generation = cache.generation;
+        cache.invalidate();
+        let query = StoryQuery::TextSearch("some".to_owned());
+        cache.insert(
+            &config,
+            generation,
+            "some".to_owned(),
+            query,
+            stories(10).into(),
+        );
+        assert!(cache.get(&config, "some").is_none());
+        assert!(cache.entries["some"].stale);
+    }
+
+    /// A search whose results are made outdated by an insert while it runs doesn't cache them as fresh.
+    #[tokio::test]
+    async fn test_search_flights_invalidated() {
+        let config = SearchCacheConfig::default();
+        let cache = SharedMut::new(SearchCache::default());
+        let flights = SearchFlights::new();
+        let (started_tx, started_rx) = tokio::sync::oneshot::channel();
+        let (finish_tx, finish_rx) = tokio::sync::oneshot::channel::<()>();
+
+        let search = flights.run(&cache, &config, "key", StoryQuery::FrontPage, |_| async {
+            started_tx.send(()).expect("Send failed");
+            finish_rx.await.expect("Receive failed");
+            Ok(stories(3))
+        });
+        let invalidate = async {
+            started_rx.await.expect("Receive failed");
+            cache.write().invalidate();
+            finish_tx.send(()).expect("Send failed");
+        };
+        let (result, _) = futures::future::join(search, invalidate).await;
+
+        // The caller still gets its results, but the next search runs again
+        assert_eq!(result.expect("Search failed").len(), 3);
+        assert!(cache.read().peek(&config, "key").is_none());
+        assert!(cache.read().entries["key"].stale);
+    }
+
+    /// Identical searches that miss the cache at the same time only run the query once.
+    #[tokio::test]
+    async fn test_search_flights_run_once() {
+        let config = SearchCacheConfig::default();
+        let cache = SharedMut::new(SearchCache::default());
+        let flights = SearchFlights::new();
+        let runs = AtomicUsize::new(0);
+
+        let search = || {
+            flights.run(&cache, &config, "key", StoryQuery::FrontPage, |_| async {
+                runs.fetch_add(1, Ordering::SeqCst);
+                tokio::time::sleep(Duration::from_millis(50)).await;
+                Ok(stories(3))
+            })
+        };
+        let results = futures::future::join_all((0..10).map(|_| search())).await;
+
+        assert_eq!(runs.load(Ordering::SeqCst), 1);
+        for result in results {
+            assert_eq!(result.expect("Search failed").len(), 3);
+        }
+        // Requests that waited on the search don't count as hits
+        assert_eq!(cache.read().entries["key"].hits.load(Ordering::SeqCst), 0);
+        assert!(flights.flights.read().is_empty());
+    }
+
+    /// When the search fails, the waiting searches run it one at a time until one succeeds.
+    #[tokio::test]
+    async fn test_search_flights_error() {
+        let config = SearchCacheConfig::default();
+        let cache = SharedMut::new(SearchCache::default());
+        let flights = SearchFlights::new();
+        let runs = AtomicUsize::new(0);
+        let running = AtomicUsize::new(0);
+        let max_running = AtomicUsize::new(0);
+
+        let search = || {
+            flights.run(&cache, &config, "key", StoryQuery::FrontPage, |_| async {
+                let run = runs.fetch_add(1, Ordering::SeqCst);
+                let now_running = running.fetch_add(1, Ordering::SeqCst) + 1;
+                max_running.fetch_max(now_running, Ordering::SeqCst);
+                tokio::time::sleep(Duration::from_millis(10)).await;
+                running.fetch_sub(1, Ordering::SeqCst);
+                if run == 0 {
+                    Err(PersistError::UnexpectedError("Search failed".into()))
+                } else {
+                    Ok(stories(3))
+                }
+            })
+        };
+        let results = futures::future::join_all((0..3).map(|_| search())).await;
+
+        assert!(results[0].is_err());
+        assert_eq!(results[1].as_ref().expect("Search failed").len(), 3);
+        assert_eq!(results[2].as_ref().expect("Search failed").len(), 3);
+        assert_eq!(runs.load(Ordering::SeqCst), 2);
+        assert_eq!(max_running.load(Ordering::SeqCst), 1);
+        assert!(flights.flights.read().is_empty());
+    }
+
+    /// A search that is dropped part-way through (ie: the client went away) still retires its flight.
+    #[tokio::test]
+    async fn test_search_flights_dropped() {
+        let config = SearchCacheConfig::default();
+        let cache = SharedMut::new(SearchCache::default());
+        let flights = SearchFlights::new();
+
+        let abandoned = flights.run(&cache, &config, "key", StoryQuery::FrontPage, |_| {
+            std::future::pending()
+        });
+        assert!(tokio::time::timeout(Duration::from_millis(10), abandoned)
+            .await
+            .is_err());
+        assert!(flights.flights.read().is_empty());
+
+        // The next search runs normally
+        let result = flights
+            .run(&cache, &config, "key", StoryQuery::FrontPage, |_| async {
+                Ok(stories(3))
+            })
+            .await
+            .expect("Search failed");
+        assert_eq!(result.len(), 3);
+        assert!(flights.flights.read().is_empty());
+    }
+
+    fn test_index(path: &Path) -> Result<Index<StoryIndex>, Box<dyn std::error::Error>> {
+        let resources = Resources::get_resources("../resource/")?;
+        Ok(Index::<StoryIndex>::initialize_with_persistence(
+            path,
+            resources.story_evaluator.clone(),
+            resources.blog_posts.clone(),
+            Shared::new(IndexConfig {
+                max_count: 300,
+                hot_set: HotSetConfig {
+                    size: 500,
+                    jitter: 0.0,
+                },
+                search_cache: Default::default(),
+            }),
+        )?)
+    }
+
+    fn scrape(id: &str, title: &str, url: &str) -> TypedScrape {
+        let date = StoryDate::year_month_day(2023, 1, 1).expect("Date failed");
+        TypedScrape::HackerNews(HackerNewsStory::new_with_defaults(
+            id.to_owned(),
+            date,
+            title.to_owned(),
+            StoryUrl::parse(url).expect("url"),
+        ))
+    }
+
+    /// A popular search that is invalidated by an insert is re-run when the hot set is refreshed, and its hit count
+    /// starts over.
+    #[tokio::test]
+    async fn test_warm_search_cache() -> Result<(), Box<dyn std::error::Error>> {
+        let tempdir = tempfile::tempdir()?;
+        let index = test_index(tempdir.path())?;
+        index
+            .insert_scrapes([scrape(
+                "1",
+                "Cobsteme whooperchia",
+                "https://one.example.com/",
+            )])
+            .await?;
+        index.refresh_hot_set().await?;
+
+        // Search often enough to make the query popular
+        let host = HostParams::new("localhost".to_owned());
+        let query = index.parse_query("cobsteme")?;
+        let key = format!("{query:?}");
+        let config = SearchCacheConfig::default();
+        for _ in 0..config.popular_hits + 2 {
+            let stories = index
+                .stories::<StoryRender>(&host, query.clone(), 0, 10)
+                .await?;
+            assert_eq!(stories.len(), 1);
+        }
+        assert_eq!(
+            hits(&index.search_cache.read(), &key),
+            config.popular_hits + 1
+        );
+
+        // A new matching story invalidates the cached results...
+        index
+            .insert_scrapes([scrape("2", "Cobsteme again", "https://two.example.com/")])
+            .await?;
+        assert!(index.search_cache.read().entries[&key].stale);
+
+        // ... and refreshing the hot set re-runs the search
+        index.refresh_hot_set().await?;
+        {
+            let cache = index.search_cache.read();
+            let entry = &cache.entries[&key];
+            assert!(!entry.stale);
+            assert_eq!(entry.stories.len(), 2);
+            assert_eq!(hits(&cache, &key), 0);
+        }
+
+        let stories = index.stories::<StoryRender>(&host, query, 0, 10).await?;
+        assert_eq!(stories.len(), 2);
+        assert_eq!(hits(&index.search_cache.read(), &key), 1);
+        Ok(())
+    }
+
+    /// Re-indexing the hot set without a configuration change rewrites nothing, so neither the hot set nor the
+    /// search cache is thrown away.
+    #[tokio::test]
+    async fn test_reindex_unchanged() -> Result<(), Box<dyn std::error::Error>> {
+        let tempdir = tempfile::tempdir()?;
+        let index = test_index(tempdir.path())?;
+        index
+            .insert_scrapes([
+                scrape("1", "Cobsteme whooperchia", "https://one.example.com/"),
+                scrape("2", "Buwheal saskimplaid", "https://two.example.com/"),
+            ])
+            .await?;
+        index.refresh_hot_set().await?;
+
+        let host = HostParams::new("localhost".to_owned());
+        let query = index.parse_query("cobsteme")?;
+        index
+            .stories::<StoryRender>(&host, query.clone(), 0, 10)
+            .await?;
+        index
+            .front_page_responses()
+            .write()
+            .insert("localhost".to_owned(), "[]".to_owned());
+
+        let res = index.reindex_hot_set().await?;
+        assert_eq!(res.len(), 2);
+        assert!(res
+            .iter()
+            .all(|res| *res == ScrapePersistResult::AlreadyPartOfExistingStory));
+
+        // The hot set wasn't refreshed, so its cached responses survive, and the search is still cached
+        assert!(index
+            .front_page_responses()
+            .read()
+            .contains_key("localhost"));
+        assert!(index
+            .search_cache
+            .read()
+            .peek(&SearchCacheConfig::default(), &format!("{query:?}"))
+            .is_some());
+        Ok(())
+    }
+}
@@ -169,6 +169,7 @@ async fn go() -> Result<(), WebError> {
                         size: 500,
                         jitter: 0.0,
                     },
+                    search_cache: Default::default(),
                 }),
             )?;
             index.backup(&backup_path)?;
@@ -96,6 +96,7 @@ mod test {
                     size: 500,
                     jitter: 0.0,
                 },
+                search_cache: Default::default(),
             }),
         )?;
         index.insert_scrapes(scrapes).await?;
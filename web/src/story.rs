@@ -36,9 +36,7 @@ impl FeedStory {
 
 impl From<StoryRender> for FeedStory {
     fn from(story: StoryRender) -> Self {
-        let comments = story
-            .sources
-            .into_with_map(|_, id| id.map(|id| id.comments_url()));
+        let comments = story.comments;
         FeedStory {
             date: story.date.to_rfc3339(),
             href: story.url,
@@ -55,6 +53,9 @@ impl From<StoryRender> for FeedStory {
 impl TryInto<StoryRender> for FeedStory {
     type Error = String;
     fn try_into(self) -> Result<StoryRender, Self::Error> {
+        let comments = self
+            .comment_urls()
+            .into_with_map(|_, url| url.map(str::to_owned));
         let sources = self.comment_urls().into_with_map_fallible(|source, url| {
             if let Some(url) = url {
                 Ok::<_, String>(Some(
@@ -78,6 +79,7 @@ impl TryInto<StoryRender> for FeedStory {
             score: 0.0,
             html: "".to_owned(),
             sources,
+            comments,
         })
     }
 }
@@ -107,11 +109,14 @@ mod tests {
             domain: "example.com".to_string(),
             order: 0,
             score: 0.0,
-            sources,
             tags: vec!["a".to_string()],
             title: "Title".to_string(),
             url: url.to_string(),
             html: "".to_string(),
+            comments: sources
+                .clone()
+                .into_with_map(|_, id| id.map(|id| id.comments_url())),
+            sources,
         };
 
         let feed_story: FeedStory = story.clone().into();
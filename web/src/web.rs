@@ -14,6 +14,7 @@ use axum::{
     routing::{get, post},
     Extension, Json, Router,
 };
+use futures::{StreamExt, TryStreamExt};
 use hyper::{header, HeaderMap, Method, StatusCode};
 use itertools::Itertools;
 use keepcalm::SharedMut;
@@ -45,6 +46,9 @@ use progscrape_scrapers::{
 };
 
 pub const BLOG_SEARCH: &str = "progscrape blog";
+/// The hosts we serve the site from. Only these get a cached copy of the default feed, so arbitrary `Host` headers
+/// can't fill the cache.
+const CANONICAL_HOSTS: [&str; 2] = ["progscrape.com", "www.progscrape.com"];
 
 #[derive(Debug, Error)]
 pub enum WebError {
@@ -653,7 +657,6 @@ async fn root(
     State((index, resources)): State<(Index<StoryIndex>, Resources)>,
     query: Query<HashMap<String, String>>,
 ) -> Result<impl IntoResponse, WebError> {
-    let now = now(&index).await?;
     let host = HostParams::new(host);
     let (search, query) = SearchParams::new(
         &index,
@@ -674,9 +677,10 @@ async fn root(
     if let StoryQuery::UrlSearch(url) = query {
         return Err(WebError::WrongUrl(format!("/s/{url}")));
     }
-    let stories = index
-        .stories::<StoryRender>(&host, query, search.offset, search.count)
-        .await?;
+    let (now, stories) = tokio::try_join!(
+        now(&index),
+        index.stories::<StoryRender>(&host, query, search.offset, search.count)
+    )?;
     let top_tags = index.top_tags(20)?;
     let path = original_uri
         .path_and_query()
@@ -696,7 +700,6 @@ async fn story(
     Host(host): Host,
     State((index, resources)): State<(Index<StoryIndex>, Resources)>,
 ) -> Result<impl IntoResponse, WebError> {
-    let now = now(&index).await?;
     let host = HostParams::new(host);
     let mut search = original_uri
         .path_and_query()
@@ -723,42 +726,47 @@ async fn story(
         return Err(WebError::WrongUrl("/".to_string()));
     };
     let offset = 0;
-    let stories = index
-        .stories::<StoryRender>(&host, query, search.offset, search.count)
-        .await?;
-    // Get the related stories for the first story
-    let mut related = vec![];
-    if let Some(story) = stories.first() {
-        let related_query = StoryQuery::RelatedSearch(story.title.clone(), story.tags.clone());
-        for story in index
-            .stories::<StoryRender>(&host, related_query, offset, 30)
-            .await?
-        {
-            if story.url == stories[0].url && story.date == stories[0].date {
-                continue;
+    let (now, stories) = tokio::try_join!(
+        now(&index),
+        index.stories::<StoryRender>(&host, query, search.offset, search.count)
+    )?;
+    // The related stories and the raw scrapes for each story are independent, so fetch them concurrently
+    let related = async {
+        // Get the related stories for the first story
+        let mut related = vec![];
+        if let Some(story) = stories.first() {
+            let related_query = StoryQuery::RelatedSearch(story.title.clone(), story.tags.clone());
+            for story in index
+                .stories::<StoryRender>(&host, related_query, offset, 30)
+                .await?
+            {
+                if story.url == stories[0].url && story.date == stories[0].date {
+                    continue;
+                }
+                related.push(story);
             }
-            related.push(story);
+        } else {
+            // No URL matching this in the index, so just run a domain search
+            let related_query = StoryQuery::DomainSearch(url.host().to_string());
+            related.append(
+                &mut index
+                    .stories::<StoryRender>(&host, related_query, offset, 30)
+                    .await?,
+            );
         }
-    } else {
-        // No URL matching this in the index, so just run a domain search
-        let related_query = StoryQuery::DomainSearch(url.host().to_string());
-        related.append(
-            &mut index
-                .stories::<StoryRender>(&host, related_query, offset, 30)
-                .await?,
-        );
-    }
-    let mut stories_with_scrapes = vec![];
-    for story in stories {
+        Ok::<_, WebError>(related)
+    };
+    let scrapes = futures::future::try_join_all(stories.iter().map(|story| async {
         let story_raw = index
             .fetch_one::<TypedScrape>(StoryQuery::ById(
                 StoryIdentifier::from_base64(story.id.clone()).ok_or(WebError::NotFound)?,
             ))
             .await?
             .ok_or(WebError::NotFound)?;
-        let scrapes = story_raw.scrapes;
-        stories_with_scrapes.push((story, scrapes));
-    }
+        Ok::<_, WebError>(story_raw.scrapes)
+    }));
+    let (related, scrapes) = tokio::try_join!(related, scrapes)?;
+    let stories_with_scrapes: Vec<_> = stories.into_iter().zip(scrapes).collect();
     let top_tags = index.top_tags(20)?;
     let path = original_uri
         .path_and_query()
@@ -808,15 +816,32 @@ async fn root_feed_json(
     State((index, _resources)): State<(Index<StoryIndex>, Resources)>,
     query: Query<HashMap<String, String>>,
 ) -> Result<impl IntoResponse, WebError> {
+    const DEFAULT_COUNT: usize = 150;
+
     let host = HostParams::new(host);
     // Allow consumers to request a story count from feed.json
     let count = query
         .get("count")
         .map(|x| x.parse::<usize>().unwrap_or_default())
-        .unwrap_or(150)
+        .unwrap_or(DEFAULT_COUNT)
         .max(1);
 
     let (search, query) = SearchParams::new(&index, query.get("search"), 0, count)?;
+
+    // The default feed is by far the most requested, so we serialize it once per hot set and host
+    let responses = if matches!(query, StoryQuery::FrontPage)
+        && count == DEFAULT_COUNT
+        && CANONICAL_HOSTS.contains(&host.host.as_str())
+    {
+        let responses = index.front_page_responses();
+        if let Some(json) = responses.read().get(&host.host) {
+            return Ok(json_response(json.clone()));
+        }
+        Some(responses)
+    } else {
+        None
+    };
+
     let stories = index
         .stories::<FeedStory>(&host, query, search.offset, search.count)
         .await?;
@@ -826,19 +851,34 @@ async fn root_feed_json(
         .map(|s| s.0)
         .collect();
 
-    Ok((
-        [(
-            header::CACHE_CONTROL,
-            HeaderValue::from_static(
-                "public, max-age=300, s-max-age=300, stale-while-revalidate=60, stale-if-error=86400",
+    let json = serde_json::to_string(&json!({
+        "v": 1,
+        "tags": top_tags,
+        "stories": stories
+    }))?;
+    if let Some(responses) = responses {
+        responses.write().insert(host.host, json.clone());
+    }
+
+    Ok(json_response(json))
+}
+
+fn json_response(json: String) -> impl IntoResponse {
+    (
+        [
+            (
+                header::CONTENT_TYPE,
+                HeaderValue::from_static("application/json"),
             ),
-        )],
-        Json(json!({
-            "v": 1,
-            "tags": top_tags,
-            "stories": stories
-        })),
-    ))
+            (
+                header::CACHE_CONTROL,
+                HeaderValue::from_static(
+                    "public, max-age=300, s-max-age=300, stale-while-revalidate=60, stale-if-error=86400",
+                ),
+            ),
+        ],
+        json,
+    )
 }
 
 async fn root_feed_xml(
@@ -1045,6 +1085,7 @@ async fn admin_cron(
         "admin/cron.html",
         context!(
             user,
+            now = StoryDate::now(),
             cron = cron.read().inspect(),
             history = cron_history.read().entries()
         ),
@@ -1148,6 +1189,36 @@ async fn admin_update_blog(
     render_admin(None, &resources, "admin/cron_blog.html", context!())
 }
 
+/// Fetch the scrape URLs concurrently using a single shared client, a few at a time so that large batches
+/// don't trip the sources' rate limits.
+async fn fetch_scrape_urls(
+    urls: Vec<String>,
+) -> Result<HashMap<String, ScraperHttpResponseInput>, WebError> {
+    /// The maximum number of scrape URLs we fetch at once
+    const MAX_CONCURRENT_FETCHES: usize = 4;
+
+    let client = reqwest::Client::new();
+    let client = &client;
+    let fetches = urls.into_iter().map(|url| async move {
+        let resp = client
+            .get(&url)
+            .header("User-Agent", "progscrape")
+            .send()
+            .await?;
+        let status = resp.status();
+        let input = if status == StatusCode::OK {
+            ScraperHttpResponseInput::Ok(resp.text().await?)
+        } else {
+            ScraperHttpResponseInput::HTTPError(status.as_u16(), status.as_str().to_owned())
+        };
+        Ok::<_, WebError>((url, input))
+    });
+    futures::stream::iter(fetches)
+        .buffer_unordered(MAX_CONCURRENT_FETCHES)
+        .try_collect()
+        .await
+}
+
 async fn admin_cron_scrape(
     State(AdminState {
         resources, index, ..
@@ -1160,23 +1231,7 @@ async fn admin_cron_scrape(
         .scrapers
         .read()
         .compute_scrape_url_demands(source, subsources);
-    let mut map = HashMap::new();
-    for url in urls {
-        let resp = reqwest::Client::new()
-            .get(&url)
-            .header("User-Agent", "progscrape")
-            .send()
-            .await?;
-        let status = resp.status();
-        if status == StatusCode::OK {
-            map.insert(url, ScraperHttpResponseInput::Ok(resp.text().await?));
-        } else {
-            map.insert(
-                url,
-                ScraperHttpResponseInput::HTTPError(status.as_u16(), status.as_str().to_owned()),
-            );
-        }
-    }
+    let map = fetch_scrape_urls(urls).await?;
     let fetch_ms = start.elapsed().as_millis();
 
     let start = Instant::now();
@@ -1266,23 +1321,7 @@ async fn admin_scrape_test(
         .scrapers
         .read()
         .compute_scrape_url_demands(params.source, params.subsources);
-    let mut map = HashMap::new();
-    for url in urls {
-        let resp = reqwest::Client::new()
-            .get(&url)
-            .header("User-Agent", "progscrape")
-            .send()
-            .await?;
-        let status = resp.status();
-        if status == StatusCode::OK {
-            map.insert(url, ScraperHttpResponseInput::Ok(resp.text().await?));
-        } else {
-            map.insert(
-                url,
-                ScraperHttpResponseInput::HTTPError(status.as_u16(), status.as_str().to_owned()),
-            );
-        }
-    }
+    let map = fetch_scrape_urls(urls).await?;
 
     let scrapes = HashMap::from_iter(map.into_iter().map(|(k, v)| {
         (